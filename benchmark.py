@@ -0,0 +1,220 @@
+"""
+Micro-benchmarks for the server hot paths.
+
+Usage:
+    python benchmark.py            # run every benchmark
+    python benchmark.py derivative # run selected benchmarks
+"""
+import sys, time, random, collections, json, asyncio, socket, threading
+
+from srv.handler.shock_handler import ShockHandler
+from srv.handler.derivative import StreamingDerivative
+from srv.handler.wave_encoder import encode_wave_frame
+from srv.connector.coyotev3ws import DGWSMessage, DGConnection
+from srv.osc.router import OSCRouter
+from pythonosc.dispatcher import Dispatcher
+from pythonosc.osc_server import AsyncIOOSCUDPServer
+from pythonosc.osc_message_builder import build_msg
+from srv.handler.base_handler import BaseHandler
+from srv.osc.fast_server import OSCFastProtocol, OSCFastUDPServer
+from srv.osc.batch_server import OSCBatchUDPServer
+
+BENCHMARKS = {}
+
+
+def benchmark(func):
+    BENCHMARKS[func.__name__[len('bench_'):]] = func
+    return func
+
+
+def timeit(func, n):
+    """Return the mean cost of func() in microseconds."""
+    t0 = time.perf_counter()
+    for _ in range(n):
+        func()
+    return (time.perf_counter() - t0) / n * 1e6
+
+
+def run_sync(coro):
+    """Drive a coroutine that never suspends without an event loop round trip."""
+    try:
+        coro.send(None)
+    except StopIteration as e:
+        return e.value
+    raise RuntimeError('Coroutine suspended.')
+
+
+def report(name, us_per_call):
+    print(f"  {name:<40} {us_per_call:10.3f} us/call {1e6 / us_per_call:14,.0f} calls/s")
+
+
+@benchmark
+def bench_derivative(n=20000):
+    """Per-tick cost of compute_derivative: numpy rebuild vs streaming estimator."""
+    samples = []
+    t = 0.0
+    for _ in range(n + 20):
+        t += random.uniform(0.01, 0.05)
+        samples.append((t, random.random()))
+
+    handler = ShockHandler.__new__(ShockHandler)
+    handler.touch_dist_arr = collections.deque(samples[:20], maxlen=20)
+    report('numpy compute_derivative (per tick)', timeit(handler.compute_derivative_numpy, n))
+
+    estimator = StreamingDerivative()
+    it = iter(samples)
+    report('streaming append + values (per sample)', timeit(lambda: estimator.append(*next(it)), n))
+    report('streaming values (per tick)', timeit(estimator.values, n))
+
+
+
+def generate_wave_100ms_format(freq, from_, to_):
+    """ShockHandler.generate_wave_100ms before the precomputed encoder, kept as reference."""
+    from_ = int(100*from_)
+    to_   = int(100*to_)
+    ret = ["{:02X}".format(freq)]*4
+    delta = (to_ - from_) // 4
+    ret += ["{:02X}".format(min(max(from_ + delta*i, 0),100)) for i in range(1,5,1)]
+    ret = ''.join(ret)
+    return json.dumps([ret],separators=(',', ':'))
+
+
+@benchmark
+def bench_wave_encoder(n=50000):
+    """Wave frame encoding: format + json.dumps vs precomputed tables and cache."""
+    frames = [(random.randint(1, 100), random.random(), random.random()) for _ in range(256)]
+    for args in frames:
+        assert ShockHandler.generate_wave_100ms(*args) == generate_wave_100ms_format(*args)
+
+    it = iter(frames * (n // len(frames) + 1))
+    report('format + json.dumps', timeit(lambda: generate_wave_100ms_format(*next(it)), n))
+    encode_wave_frame.cache_clear()
+    it = iter(frames * (n // len(frames) + 1))
+    report('generate_wave_100ms (cached encoder)', timeit(lambda: ShockHandler.generate_wave_100ms(*next(it)), n))
+    encode_wave_frame.cache_clear()
+    report('encode_wave_frame (cold, cache miss)', timeit(lambda: encode_wave_frame(random.randint(1, 100), random.randint(0, 100), random.randint(0, 100)), n))
+
+
+
+class NullWebSocket():
+    id = 'bench-device'
+
+    async def send(self, msg):
+        pass
+
+
+BENCH_SETTINGS = {
+    'ws': {'master_uuid': 'bench-master'},
+    'dglab3': {'channel_a': {'strength_limit': 200}, 'channel_b': {'strength_limit': 200}},
+}
+
+
+@benchmark
+def bench_serialization(n=50000):
+    """DG-Lab message serialization: json.dumps per message vs per-connection templates."""
+    async def run():
+        conn = DGConnection(NullWebSocket(), SETTINGS=BENCH_SETTINGS)
+        conn.strength_max = {'A': 200, 'B': 200}
+        wave = encode_wave_frame(10, 20, 60)
+        pulse = f"pulse-A:{wave}"
+        assert str(DGWSMessage('msg', conn.master_uuid, conn.uuid, pulse)) == DGWSMessage.render(conn.msg_template, pulse)
+        for value in (0, 77, 200):
+            assert str(DGWSMessage('msg', conn.master_uuid, conn.uuid, f"strength-1+2+{value}")) == conn.strength_msgs[('A', value)]
+
+        report('json.dumps pulse', timeit(lambda: str(DGWSMessage('msg', conn.master_uuid, conn.uuid, pulse)), n))
+        report('template pulse', timeit(lambda: DGWSMessage.render(conn.msg_template, pulse), n))
+        report('json.dumps strength', timeit(lambda: str(DGWSMessage('msg', conn.master_uuid, conn.uuid, 'strength-1+2+77')), n))
+        report('precomputed strength', timeit(lambda: conn.strength_msgs[('A', 77)], n))
+        report('send_wave (render + enqueue)', timeit(lambda: run_sync(conn.send_wave('A', wave)), n))
+        report('set_strength (lookup + enqueue)', timeit(lambda: run_sync(conn.set_strength('A', value=77)), n))
+    asyncio.run(run())
+
+
+
+@benchmark
+def bench_osc_routing(n=20000):
+    """Per-message OSC routing cost: Dispatcher vs compiled OSCRouter, by number of mapped params."""
+    traffic = [f'/avatar/parameters/Unrelated/Param{i}' for i in range(300)]
+    for n_params in (8, 64, 256):
+        params = [f'/avatar/parameters/Shock/TouchArea{i}' for i in range(n_params - 2)]
+        params += ['/avatar/parameters/Shock/wildcard/*', '/avatar/parameters/lms-penis-proximityA*']
+        traffic_mix = traffic + params[:20] + ['/avatar/parameters/Shock/wildcard/x']
+        for cls in (Dispatcher, OSCRouter):
+            dispatcher = cls()
+            for param in params:
+                dispatcher.map(param, print)
+            it = iter(traffic_mix * (n // len(traffic_mix) + 1))
+            report(f'{cls.__name__} {n_params} params', timeit(lambda: list(dispatcher.handlers_for_address(next(it))), n))
+
+
+
+class CountingHandler(BaseHandler):
+    """OSC handler that only counts samples, keeps the event loop out of the measurement."""
+    def __init__(self) -> None:
+        self.count = 0
+
+    def osc_value_handler(self, address, val, t=None):
+        self.count += 1
+
+
+@benchmark
+def bench_osc_datagram(n=50000):
+    """OSC datagram throughput: pythonosc protocol vs raw fast path, 90% unrelated avatar params."""
+    handler = CountingHandler()
+    router = OSCRouter()
+    for param in ['/avatar/parameters/pcs/contact/enterPass', '/avatar/parameters/Shock/TouchAreaA', '/avatar/parameters/Shock/wildcard/*']:
+        router.map(param, handler.osc_handler)
+    router.compile()
+    datagrams = [build_msg(f'/avatar/parameters/Unrelated/Param{i}', random.random()).dgram for i in range(90)]
+    datagrams += [build_msg('/avatar/parameters/Shock/TouchAreaA', random.random()).dgram for _ in range(5)]
+    datagrams += [build_msg(f'/avatar/parameters/Shock/wildcard/{i}', random.random()).dgram for i in range(5)]
+    random.shuffle(datagrams)
+    client = ('127.0.0.1', 9000)
+    for protocol in (AsyncIOOSCUDPServer._OSCProtocolFactory(router), OSCFastProtocol(router)):
+        handler.count = 0
+        it = iter(datagrams * (n // len(datagrams) + 1))
+        us = timeit(lambda: protocol.datagram_received(next(it), client), n)
+        report(f'{type(protocol).__name__} ({handler.count} matched)', us)
+
+
+@benchmark
+def bench_osc_receive(n=20000):
+    """Loopback UDP spam: event-loop callbacks per datagram, asyncio endpoint vs batch receive thread."""
+    datagram = build_msg('/avatar/parameters/Shock/TouchAreaA', 0.5).dgram
+
+    async def run(server_cls):
+        handler = CountingHandler()
+        router = OSCRouter()
+        router.map('/avatar/parameters/Shock/TouchAreaA', handler.osc_handler)
+        router.compile()
+        server = server_cls(('127.0.0.1', 0), router, asyncio.get_running_loop())
+        transport, protocol = await server.create_serve_endpoint()
+        address = transport.get_extra_info('sockname') if server_cls is OSCFastUDPServer else protocol.sock.getsockname()
+
+        def blast():
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+                for i in range(n):
+                    sock.sendto(datagram, address)
+                    if i % 64 == 0:
+                        time.sleep(0)
+        t0 = time.perf_counter()
+        sender = threading.Thread(target=blast)
+        sender.start()
+        while sender.is_alive() or protocol.stats['received'] > handler.count:
+            await asyncio.sleep(0.01)
+        elapsed = time.perf_counter() - t0
+        transport.close()
+        received = protocol.stats['received']
+        callbacks = protocol.stats.get('drains', received)
+        print(f"  {server_cls.__name__:<24} received {received:6d}/{n}  loop callbacks {callbacks:6d}"
+              f"  ({callbacks / max(received, 1):.3f} per datagram, {received / elapsed:,.0f} datagrams/s)")
+
+    for server_cls in (OSCFastUDPServer, OSCBatchUDPServer):
+        asyncio.run(run(server_cls))
+
+
+if __name__ == "__main__":
+    selected = sys.argv[1:] or list(BENCHMARKS)
+    for name in selected:
+        print(f"[{name}] {BENCHMARKS[name].__doc__}")
+        BENCHMARKS[name]()
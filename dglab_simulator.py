@@ -0,0 +1,242 @@
+"""
+Local DG-Lab app simulator for load and latency testing.
+
+Spawns virtual Coyote v3 apps that speak the protocol DGConnection.serve expects:
+bind handshake, strength reports, heartbeats, and pulse-/clear- consumption.
+
+Usage:
+    python dglab_simulator.py --devices 200 --duration 30
+    python dglab_simulator.py --url ws://127.0.0.1:28846/<master_uuid>
+"""
+import argparse, asyncio, json, os, time, random
+import yaml
+import websockets
+
+CONFIG_FILENAME = 'settings-advanced-v0.2.yaml'
+FRAME_TIME = 0.1  # Each pulse frame is 100ms
+# Idle keepalive of the server (srv/connector/coyotev3ws.py), never a probe reply
+KEEPALIVE_POWER = 1
+KEEPALIVE_INTENSITY = 1
+
+
+def frame_intensity(frame):
+    """Peak intensity of one 8 byte hex pulse frame (4 frequency + 4 intensity bytes)."""
+    return max(bytes.fromhex(frame[8:16]))
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def summarize(values, scale=1000):
+    return {
+        'n': len(values),
+        'p50': round(percentile(values, 50) * scale, 3),
+        'p95': round(percentile(values, 95) * scale, 3),
+        'p99': round(percentile(values, 99) * scale, 3),
+        'max': round(max(values) * scale, 3) if values else 0.0,
+    }
+
+
+class SimulatorStats():
+    def __init__(self) -> None:
+        self.connected = 0
+        self.bound = 0
+        self.failed = 0
+        self.messages = {'pulse': 0, 'strength': 0, 'clear': 0, 'heartbeat': 0, 'other': 0}
+        self.frames = {'A': 0, 'B': 0}
+        self.jitter = {'A': [], 'B': []}        # |actual - expected| pulse arrival spacing
+        self.echo_latency = {'A': [], 'B': []}  # strength report -> server strength reply
+        self.probe_latency = []                 # filled by osc_workload.py probes
+        self.probe_callback = None
+
+    def report(self, duration):
+        print(f"devices: connected {self.connected}, bound {self.bound}, failed {self.failed}")
+        print(f"messages: {self.messages}")
+        for chann in ['A', 'B']:
+            rate = self.frames[chann] / max(self.bound, 1) / max(duration, 1e-9)
+            print(f"channel {chann}: {self.frames[chann]} frames ({rate:.1f} frames/s per device)")
+            print(f"  frame jitter ms      {summarize(self.jitter[chann])}")
+            print(f"  strength echo ms     {summarize(self.echo_latency[chann])}")
+        if self.probe_latency:
+            print(f"probe end-to-end ms    {summarize(self.probe_latency)}")
+
+
+class VirtualDevice():
+    """One simulated DG-Lab app connected to the server's WebSocket."""
+
+    def __init__(self, url, master_uuid, stats: SimulatorStats, strength_max=200,
+                 echo=True, heartbeat_interval=60, probe_interval=1.0) -> None:
+        self.url = url
+        self.master_uuid = master_uuid
+        self.stats = stats
+        self.strength = {'A': 0, 'B': 0}
+        self.strength_max = {'A': strength_max, 'B': strength_max}
+        self.echo = echo
+        self.heartbeat_interval = heartbeat_interval
+        self.probe_interval = probe_interval
+        self.client_id = None
+        self.ws = None
+        self.next_frame_time = {'A': None, 'B': None}
+        self.probe_sent = {'A': None, 'B': None}
+        self.probe_value = {'A': None, 'B': None}
+
+    async def send(self, type, message):
+        await self.ws.send(json.dumps({
+            'type': type,
+            'clientId': self.master_uuid,
+            'targetId': self.client_id,
+            'message': message,
+        }))
+
+    async def report_strength(self):
+        s, m = self.strength, self.strength_max
+        await self.send('msg', f"strength-{s['A']}+{s['B']}+{m['A']}+{m['B']}")
+
+    async def heartbeat(self):
+        while 1:
+            await asyncio.sleep(self.heartbeat_interval)
+            await self.send('heartbeat', '200')
+
+    async def probe(self):
+        """Report a strength the server must correct, time until the correction arrives."""
+        while 1:
+            await asyncio.sleep(self.probe_interval * random.uniform(0.5, 1.5))
+            chann = random.choice(['A', 'B'])
+            if self.probe_sent[chann] is not None:
+                continue
+            self.strength[chann] = 1 if self.strength[chann] != 1 else 2
+            self.probe_value[chann] = self.strength[chann]
+            self.probe_sent[chann] = time.monotonic()
+            await self.report_strength()
+
+    def is_probe_reply(self, chann, mode, value):
+        """The server corrects a probe with an absolute set to its limit, unlike the keepalive's set to 1."""
+        return mode == '2' and value not in (self.probe_value[chann], KEEPALIVE_POWER)
+
+    def on_pulse(self, chann, wave, now):
+        frames = wave.count(',') + 1
+        self.stats.frames[chann] += frames
+        expected = self.next_frame_time[chann]
+        if expected is not None and now - expected < 1.0:
+            self.stats.jitter[chann].append(abs(now - expected))
+        self.next_frame_time[chann] = now + frames * FRAME_TIME
+        if self.stats.probe_callback is not None:
+            self.stats.probe_callback(chann, wave, now)
+
+    async def on_message(self, event, now):
+        stats = self.stats
+        if event['type'] == 'bind':
+            if self.client_id is None:
+                self.client_id = event['clientId']
+                await self.send('bind', 'DGLAB')
+            elif event['message'] == '200':
+                stats.bound += 1
+                await self.report_strength()
+            return
+        if event['type'] == 'heartbeat':
+            stats.messages['heartbeat'] += 1
+            return
+        message = event['message']
+        if message.startswith('pulse-'):
+            stats.messages['pulse'] += 1
+            chann, wave = message[len('pulse-'):].split(':', 1)
+            self.on_pulse(chann, wave, now)
+        elif message.startswith('strength-'):
+            stats.messages['strength'] += 1
+            chann_id, mode, value = message[len('strength-'):].split('+')
+            chann = 'A' if chann_id == '1' else 'B'
+            value = int(value)
+            if mode == '0':
+                value = self.strength[chann] - value
+            elif mode == '1':
+                value = self.strength[chann] + value
+            self.strength[chann] = min(max(value, 0), self.strength_max[chann])
+            if self.probe_sent[chann] is not None and self.is_probe_reply(chann, mode, value):
+                stats.echo_latency[chann].append(now - self.probe_sent[chann])
+                self.probe_sent[chann] = None
+            if self.echo:
+                # The real app reports its new strength after every change
+                await self.report_strength()
+        elif message.startswith('clear-'):
+            stats.messages['clear'] += 1
+            chann = 'A' if message[len('clear-'):] == '1' else 'B'
+            self.next_frame_time[chann] = None
+        else:
+            stats.messages['other'] += 1
+
+    async def run(self):
+        try:
+            self.ws = await websockets.connect(self.url, max_size=None)
+        except Exception:
+            self.stats.failed += 1
+            return
+        self.stats.connected += 1
+        tasks = [asyncio.ensure_future(self.heartbeat())]
+        if self.probe_interval:
+            tasks.append(asyncio.ensure_future(self.probe()))
+        try:
+            async for raw in self.ws:
+                await self.on_message(json.loads(raw), time.monotonic())
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+async def run_simulator(url, master_uuid, devices=10, duration=30, ramp=0.01, stats=None, **device_kwargs):
+    """Connect `devices` virtual apps for `duration` seconds, return the collected stats."""
+    stats = stats or SimulatorStats()
+    sims = []
+    tasks = []
+    for _ in range(devices):
+        sim = VirtualDevice(url, master_uuid, stats, **device_kwargs)
+        sims.append(sim)
+        tasks.append(asyncio.ensure_future(sim.run()))
+        await asyncio.sleep(ramp)
+    await asyncio.sleep(duration)
+    for sim in sims:
+        if sim.ws is not None:
+            await sim.ws.close()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return stats
+
+
+def load_server_settings():
+    if not os.path.exists(CONFIG_FILENAME):
+        return None
+    with open(CONFIG_FILENAME, 'r', encoding='utf-8') as fr:
+        return yaml.safe_load(fr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Simulate DG-Lab apps against a local Shocking-VRChat server.')
+    parser.add_argument('--url', help='ws://host:port/<master_uuid>, defaults to the local settings file')
+    parser.add_argument('--devices', type=int, default=10)
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--strength-max', type=int, default=200)
+    parser.add_argument('--probe-interval', type=float, default=1.0, help='seconds between strength echo probes, 0 to disable')
+    parser.add_argument('--no-echo', action='store_true', help='do not report strength back after every change')
+    args = parser.parse_args()
+
+    url = args.url
+    if url is None:
+        settings = load_server_settings()
+        if settings is None:
+            parser.error(f'{CONFIG_FILENAME} not found, please pass --url')
+        url = f"ws://127.0.0.1:{settings['ws']['listen_port']}/{settings['ws']['master_uuid']}"
+    master_uuid = url.rstrip('/').rsplit('/', 1)[-1]
+
+    stats = asyncio.run(run_simulator(
+        url, master_uuid, devices=args.devices, duration=args.duration,
+        strength_max=args.strength_max, echo=not args.no_echo, probe_interval=args.probe_interval,
+    ))
+    stats.report(args.duration)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,7 +5,7 @@ Full replacement for CMD application - runs server internally
 """
 
 import tkinter as tk
-from tkinter import ttk, messagebox, scrolledtext
+from tkinter import ttk, messagebox, scrolledtext, filedialog
 import yaml
 import os
 import sys
@@ -92,6 +92,12 @@ SETTINGS_DEFAULT = {
     'SERVER_IP': None,
     'dglab3': {
         'channel_a': {
+            'feeder_mode': 'deadline', # deadline or poll
+            'derivative_method': 'streaming', # streaming or numpy
+            'resample_hz': 0, # 0 disables, e.g. 100 for a 100Hz input grid
+            'resample_delay': 0.03, # seconds of jitter buffer when resampling
+            'mix_mode': 'last', # last (last writer wins), max, sum or mean
+            'param_weights': {}, # avatar param -> weight when mix_mode is not last
             'mode_config': {
                 'shock': {
                     'duration': 2,
@@ -117,6 +123,12 @@ SETTINGS_DEFAULT = {
             }
         },
         'channel_b': {
+            'feeder_mode': 'deadline', # deadline or poll
+            'derivative_method': 'streaming', # streaming or numpy
+            'resample_hz': 0, # 0 disables, e.g. 100 for a 100Hz input grid
+            'resample_delay': 0.03, # seconds of jitter buffer when resampling
+            'mix_mode': 'last', # last (last writer wins), max, sum or mean
+            'param_weights': {}, # avatar param -> weight when mix_mode is not last
             'mode_config': {
                 'shock': {
                     'duration': 2,
@@ -150,6 +162,12 @@ SETTINGS_DEFAULT = {
     'osc': {
         'listen_host': '127.0.0.1',
         'listen_port': 9001,
+        'fast_path': True,
+        'batch_receive': False,
+        'avatar_profiles': {}, # avatar id -> {'channel_a': [params], 'channel_b': [params]}
+        'relay_ports': [], # forward raw OSC to other local apps, e.g. [9002] or ['127.0.0.1:9010']
+        'relay_prefixes': [], # only relay these address prefixes, empty relays everything
+        'record_path': None, # append received OSC datagrams to this file, replay with osc_replay.py
     },
     'web_server': {
         'listen_host': '127.0.0.1',
@@ -1509,6 +1527,7 @@ class PowerVisualizerPanel(tk.Frame):
         self.enabled = tk.BooleanVar(value=True)
         self.update_interval = 60  # ms (~16fps)
         self._after_id = None
+        self._latency_ticks = 0
         self._create_widgets()
         self._schedule_update()
     
@@ -1587,6 +1606,13 @@ class PowerVisualizerPanel(tk.Frame):
                            bg=NothingPhoneStyle.BG_SECONDARY,
                            fg=NothingPhoneStyle.TEXT_MUTED)
             lbl.pack(side=tk.LEFT)
+        
+        # End-to-end latency, OSC receive -> WebSocket write
+        self.latency_label = tk.Label(self.content_frame, text="Latency: no data",
+                                      font=self.fonts['small'], anchor='w',
+                                      bg=NothingPhoneStyle.BG_SECONDARY,
+                                      fg=NothingPhoneStyle.TEXT_MUTED)
+        self.latency_label.pack(fill=tk.X, pady=(0, 5))
     
     def _toggle(self):
         if self.enabled.get():
@@ -1732,6 +1758,19 @@ class PowerVisualizerPanel(tk.Frame):
             self._draw_channel(self.canvas_b, 'B', data_b)
         except ImportError:
             pass  # Server not started yet
+        self._latency_ticks += 1
+        if self._latency_ticks % 8 == 0:
+            self._update_latency()
+    
+    def _update_latency(self):
+        """Refresh the per-channel p50/p95/p99 line (~2Hz)"""
+        from srv.runtime.latency import latency_summary
+        parts = []
+        for channel, stages in latency_summary().items():
+            total = stages['total']
+            if total['n']:
+                parts.append(f"{channel} p50 {total['p50']:.1f} / p95 {total['p95']:.1f} / p99 {total['p99']:.1f} ms")
+        self.latency_label.configure(text="Latency: " + ("   ".join(parts) if parts else "no data"))
     
     def destroy(self):
         """Clean up scheduled updates"""
@@ -2018,6 +2057,29 @@ class SystemLogsPanel(tk.Frame):
                                      command=self._toggle_auto_scroll)
         btn_scroll.pack(side=tk.RIGHT, padx=(0, 5))
         
+        # Stage profiler: record spans while ON, TRACE saves them as Chrome trace JSON
+        btn_trace = tk.Button(header, text="TRACE",
+                              font=self.fonts['small'],
+                              bg=NothingPhoneStyle.BG_TERTIARY,
+                              fg=NothingPhoneStyle.TEXT_SECONDARY,
+                              activebackground=NothingPhoneStyle.ACCENT_RED,
+                              bd=0, width=6,
+                              cursor="hand2",
+                              command=self._export_trace)
+        btn_trace.pack(side=tk.RIGHT, padx=(0, 5))
+        
+        self.profile_var = tk.BooleanVar(value=False)
+        btn_profile = tk.Checkbutton(header, text="PROFILE",
+                                     font=self.fonts['small'],
+                                     variable=self.profile_var,
+                                     bg=NothingPhoneStyle.BG_SECONDARY,
+                                     fg=NothingPhoneStyle.TEXT_SECONDARY,
+                                     selectcolor=NothingPhoneStyle.BG_TERTIARY,
+                                     activebackground=NothingPhoneStyle.BG_SECONDARY,
+                                     bd=0,
+                                     command=self._toggle_profiler)
+        btn_profile.pack(side=tk.RIGHT, padx=(0, 5))
+        
         # Log container
         log_frame = tk.Frame(self, bg=NothingPhoneStyle.BG_TERTIARY)
         log_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=(5, 10))
@@ -2118,6 +2180,31 @@ class SystemLogsPanel(tk.Frame):
         self.log_text.delete('1.0', tk.END)
         self.log_text.configure(state=tk.DISABLED)
         gui_logger.info("Logs cleared")
+    
+    def _toggle_profiler(self):
+        from srv.runtime.profiler import PROFILER
+        if self.profile_var.get():
+            PROFILER.start()
+            gui_logger.info("Profiler started")
+        else:
+            PROFILER.stop()
+            gui_logger.info(f"Profiler stopped, {PROFILER.status()['spans']} spans recorded")
+    
+    def _export_trace(self):
+        from srv.runtime.profiler import PROFILER
+        if not PROFILER.status()['spans']:
+            gui_logger.warning("No profiler spans recorded, turn PROFILE on first")
+            return
+        path = filedialog.asksaveasfilename(
+            defaultextension=".json",
+            initialfile=f"trace-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json",
+            filetypes=[("Chrome trace", "*.json")],
+        )
+        if not path:
+            return
+        with open(path, 'w', encoding='utf-8') as fw:
+            json.dump(PROFILER.export(), fw)
+        gui_logger.success(f"Trace saved to {path}, open it in chrome://tracing or ui.perfetto.dev")
 
 
 class ConfigEditor(tk.Frame):
@@ -2362,18 +2449,22 @@ class ServerManager:
     
     def _run_server(self):
         """Internal server runner"""
+        osc_endpoint = {}
         try:
             # Import server modules
             sys.path.insert(0, os.path.dirname(__file__))
             
             from flask import Flask
-            from pythonosc.osc_server import AsyncIOOSCUDPServer
-            from pythonosc.dispatcher import Dispatcher
             from websockets import serve as wsserve
             
             import srv
             from srv.connector.coyotev3ws import DGConnection
             from srv.handler.shock_handler import ShockHandler
+            from srv.osc.router import OSCRouter
+            from srv.osc.server import create_osc_server
+            from srv.osc.mixer import ParamMixer
+            from srv.osc.profiles import channel_router, build_routing
+            from srv.runtime.loop_monitor import LOOP_MONITOR
             
             # Store DGConnection reference for test shock
             self.dg_connection = DGConnection
@@ -2381,8 +2472,11 @@ class ServerManager:
             self.on_log.success("Modules loaded successfully")
             
             # Setup dispatcher and handlers
-            dispatcher = Dispatcher()
+            dispatcher = OSCRouter()
+            mixer = ParamMixer()
             handlers = []
+            channel_routers = {}
+            default_params = {}
             
             # Merge settings
             for chann in ['channel_a', 'channel_b']:
@@ -2398,9 +2492,12 @@ class ServerManager:
                 chann_mode = self.settings['dglab3'][config_chann_name]['mode']
                 shock_handler = ShockHandler(SETTINGS=self.settings, DG_CONN=DGConnection, channel_name=chann)
                 handlers.append(shock_handler)
-                for param in self.settings['dglab3'][config_chann_name]['avatar_params']:
+                chann_settings = self.settings['dglab3'][config_chann_name]
+                for param in chann_settings['avatar_params']:
                     self.on_log.success(f"Channel {chann} Mode: {chann_mode} Listening: {param}")
-                    dispatcher.map(param, shock_handler.osc_handler)
+                channel_routers[config_chann_name] = channel_router(shock_handler, chann_settings, mixer)
+                default_params[config_chann_name] = chann_settings['avatar_params']
+            build_routing(dispatcher, channel_routers, default_params, profiles=self.settings['osc'].get('avatar_profiles'), mixer=mixer)
             
             # Run async server
             self.loop = asyncio.new_event_loop()
@@ -2411,16 +2508,16 @@ class ServerManager:
                 await client.serve()
             
             async def run():
+                LOOP_MONITOR.start()
                 for handler in handlers:
                     handler.start_background_jobs()
                 
                 try:
-                    server = AsyncIOOSCUDPServer(
-                        (self.settings["osc"]["listen_host"], self.settings["osc"]["listen_port"]),
-                        dispatcher, self.loop
-                    )
+                    server = create_osc_server(self.settings['osc'], dispatcher, self.loop)
                     self.on_log.success(f'OSC Listening: {self.settings["osc"]["listen_host"]}:{self.settings["osc"]["listen_port"]}')
                     transport, protocol = await server.create_serve_endpoint()
+                    osc_endpoint['transport'] = transport
+                    osc_endpoint['protocol'] = protocol
                 except Exception as e:
                     self.on_log.error(f"OSC listen failed: {str(e)}")
                     return
@@ -2435,8 +2532,6 @@ class ServerManager:
                 except Exception as e:
                     self.on_log.error(f"WebSocket listen failed: {str(e)}")
                     return
-                
-                transport.close()
             
             self.loop.run_until_complete(run())
             
@@ -2445,6 +2540,14 @@ class ServerManager:
             import traceback
             self.on_log.error(traceback.format_exc())
         finally:
+            # stop() may halt the loop in the middle of run(): release the OSC socket,
+            # relay and recorder here so a restart does not leak them
+            if 'transport' in osc_endpoint:
+                osc_endpoint['transport'].close()
+                if hasattr(osc_endpoint['protocol'], 'close_outputs'):
+                    osc_endpoint['protocol'].close_outputs()
+                if self.loop is not None and not self.loop.is_running():
+                    self.loop.run_until_complete(asyncio.sleep(0))  # Let the transport finish closing
             self.running = False
     
     def update_strength_limit(self, channel, value):
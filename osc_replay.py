@@ -0,0 +1,97 @@
+"""
+Replay an OSC recording into a running Shocking-VRChat server.
+
+Record real play sessions by setting `osc.record_path` in
+settings-advanced-v0.2.yaml, then:
+
+Usage:
+    python osc_replay.py session.svosc                # real time
+    python osc_replay.py session.svosc --speed 4      # 4x faster
+    python osc_replay.py session.svosc --speed 0      # as fast as possible
+    python osc_replay.py session.svosc --info         # print recording summary
+"""
+import argparse, os, socket, time
+import yaml
+
+from srv.osc.recorder import read_recording
+from dglab_simulator import summarize, CONFIG_FILENAME
+
+
+def load_recording(path):
+    """[(seconds since replay start, datagram)], sessions are concatenated back to back."""
+    records = []
+    base = 0.0
+    last = 0.0
+    for item in read_recording(path):
+        if item is None:
+            base = last
+            continue
+        offset, data = item
+        last = base + offset
+        records.append((last, data))
+    return records
+
+
+def replay(records, address, speed=1.0, loops=1):
+    """Send records to address, speed 0 means no pacing. Returns the lateness of each send in seconds."""
+    lateness = []
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        for _ in range(loops):
+            start = time.perf_counter()
+            for offset, data in records:
+                if speed:
+                    deadline = start + offset / speed
+                    delay = deadline - time.perf_counter()
+                    if delay > 0.002:
+                        time.sleep(delay - 0.001)
+                    while time.perf_counter() < deadline:
+                        pass
+                    lateness.append(time.perf_counter() - deadline)
+                sock.sendto(data, address)
+    return lateness
+
+
+def info(records):
+    addresses = {}
+    for _, data in records:
+        address = data[:data.find(b'\x00')].decode('ascii', 'replace')
+        addresses[address] = addresses.get(address, 0) + 1
+    duration = records[-1][0] if records else 0.0
+    print(f"{len(records)} datagrams over {duration:.1f}s ({len(records) / max(duration, 1e-9):.0f}/s), {len(addresses)} addresses")
+    for address, count in sorted(addresses.items(), key=lambda kv: -kv[1])[:20]:
+        print(f"  {count:8d}  {address}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay an OSC recording into a running Shocking-VRChat server.')
+    parser.add_argument('path')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, help='defaults to osc.listen_port of the local settings file, or 9001')
+    parser.add_argument('--speed', type=float, default=1.0, help='1 for real time, N for N times faster, 0 for max speed')
+    parser.add_argument('--loops', type=int, default=1)
+    parser.add_argument('--info', action='store_true', help='print a summary of the recording and exit')
+    args = parser.parse_args()
+
+    records = load_recording(args.path)
+    if args.info:
+        info(records)
+        return
+
+    port = args.port
+    if port is None:
+        port = 9001
+        if os.path.exists(CONFIG_FILENAME):
+            with open(CONFIG_FILENAME, 'r', encoding='utf-8') as fr:
+                port = yaml.safe_load(fr)['osc']['listen_port']
+
+    t0 = time.perf_counter()
+    lateness = replay(records, (args.host, port), speed=args.speed, loops=args.loops)
+    elapsed = time.perf_counter() - t0
+    sent = len(records) * args.loops
+    print(f"sent {sent} datagrams in {elapsed:.2f}s ({sent / max(elapsed, 1e-9):,.0f}/s)")
+    if lateness:
+        print(f"send lateness ms {summarize(lateness)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""
+Synthetic OSC workload generator for load and latency testing.
+
+Sends proximity sweeps, sharp impacts and oscillating contact to mapped avatar
+params plus background spam on unrelated addresses, at a target total rate.
+With --simulate, virtual DG-Lab apps (dglab_simulator.py) are connected too
+and probe contacts on --probe-param are timed from the OSC send to the first
+pulse frame that reaches a simulated app.
+
+Usage:
+    python osc_workload.py --rate 20000 --duration 30
+    python osc_workload.py --rate 5000 --simulate 10 --shapes sweep,impact
+"""
+import argparse, asyncio, json, math, random, socket, struct, threading, time
+
+from dglab_simulator import SimulatorStats, run_simulator, load_server_settings, frame_intensity, KEEPALIVE_INTENSITY
+
+FLOAT = struct.Struct('>f')
+
+
+def osc_prefix(address):
+    """Raw OSC address and ',f' type tag, a float argument completes the datagram."""
+    raw = address.encode('ascii') + b'\x00'
+    raw += b'\x00' * (-len(raw) % 4)
+    return raw + b',f\x00\x00'
+
+
+def sweep(t, period):
+    """Proximity sweep, triangle 0 -> 1 -> 0."""
+    x = (t / period) % 1.0
+    return 2 * x if x < 0.5 else 2 - 2 * x
+
+
+def impact(t, period):
+    """Sharp hit to 1, fast decay, then no contact for the rest of the period."""
+    x = (t / period) % 1.0
+    return math.exp(-x * period / 0.05) if x * period < 0.3 else 0.0
+
+
+def oscillation(t, period):
+    """Rubbing contact oscillating around the middle of the range."""
+    return 0.5 + 0.4 * math.sin(2 * math.pi * t / period)
+
+
+SHAPES = {
+    'sweep': sweep,
+    'impact': impact,
+    'oscillation': oscillation,
+}
+
+
+class WorkloadStats():
+    def __init__(self) -> None:
+        self.sent = {'contact': 0, 'spam': 0, 'probe': 0}
+        self.elapsed = 0.0
+        self.max_lag = 0.0  # Worst backlog behind the target rate, in seconds
+        self.probes_lost = 0
+
+
+class Probe():
+    """Contact on an otherwise idle channel, timed until its first pulse frame arrives."""
+
+    def __init__(self, address, channel, interval, stats: SimulatorStats, workload: WorkloadStats) -> None:
+        self.prefix = osc_prefix(address)
+        self.channel = channel
+        self.interval = interval
+        self.stats = stats
+        self.workload = workload
+        self.sent_at = None
+        stats.probe_callback = self.on_pulse
+
+    def on_pulse(self, chann, wave, now):
+        sent_at = self.sent_at
+        if chann != self.channel or sent_at is None:
+            return
+        # Idle keepalive pulses ('01' intensity) arrive regardless of the probe
+        if any(frame_intensity(frame) > KEEPALIVE_INTENSITY for frame in json.loads(wave)):
+            self.stats.probe_latency.append(now - sent_at)
+            self.sent_at = None
+
+    def run(self, sock, address, stop: threading.Event):
+        while not stop.wait(self.interval * random.uniform(0.8, 1.2)):
+            if self.sent_at is not None:
+                self.workload.probes_lost += 1
+            self.sent_at = time.monotonic()
+            # Hold the contact like VRChat does, then release and let the channel clear
+            for _ in range(6):
+                sock.sendto(self.prefix + FLOAT.pack(1.0), address)
+                self.workload.sent['probe'] += 1
+                time.sleep(0.05)
+            sock.sendto(self.prefix + FLOAT.pack(0.0), address)
+            self.workload.sent['probe'] += 1
+
+
+def build_streams(contact_params, shapes, spam_params):
+    """[(prefix, shape, period, phase, kind)], contact params get the shapes round robin."""
+    streams = []
+    for i, address in enumerate(contact_params):
+        shape = SHAPES[shapes[i % len(shapes)]]
+        streams.append((osc_prefix(address), shape, random.uniform(0.5, 3.0), random.uniform(0, 10), 'contact'))
+    for i in range(spam_params):
+        streams.append((osc_prefix(f'/avatar/parameters/Workload/Spam{i}'), None, 0, 0, 'spam'))
+    return streams
+
+
+def generate(sock, address, streams, rate, spam_ratio, duration, workload: WorkloadStats, stop: threading.Event):
+    """Send at `rate` messages/s, `spam_ratio` of them on spam streams, catching up in bursts."""
+    contact = [s for s in streams if s[4] == 'contact']
+    spam = [s for s in streams if s[4] == 'spam']
+    if not contact:
+        spam_ratio = 1.0
+    if not spam:
+        spam_ratio = 0.0
+    start = time.perf_counter()
+    sent = 0
+    sendto = sock.sendto
+    while not stop.is_set():
+        elapsed = time.perf_counter() - start
+        if elapsed >= duration:
+            break
+        due = int(rate * elapsed) - sent
+        if due <= 0:
+            time.sleep(min(0.001, (sent + 1) / rate - elapsed))
+            continue
+        workload.max_lag = max(workload.max_lag, due / rate)
+        for _ in range(min(due, 1000)):
+            # Spread the spam share evenly over the message sequence
+            if int((sent + 1) * spam_ratio) > int(sent * spam_ratio):
+                prefix, shape, period, phase, kind = spam[sent % len(spam)]
+                value = random.random()
+            else:
+                prefix, shape, period, phase, kind = contact[sent % len(contact)]
+                value = shape(elapsed + phase, period)
+            sendto(prefix + FLOAT.pack(value), address)
+            workload.sent[kind] += 1
+            sent += 1
+    workload.elapsed = time.perf_counter() - start
+
+
+def expand(params, count):
+    """Up to `count` concrete addresses, trailing '*' patterns are numbered until the count is reached."""
+    out = [p for p in params if not p.endswith('*')][:count]
+    patterns = [p[:-1] for p in params if p.endswith('*')]
+    i = 0
+    while len(out) < count and patterns:
+        out.append(f'{patterns[i % len(patterns)]}{i // len(patterns)}')
+        i += 1
+    return out
+
+
+async def run(args):
+    settings = load_server_settings() or {}
+    osc_port = args.port or settings.get('osc', {}).get('listen_port', 9001)
+    address = (args.host, osc_port)
+    streams = build_streams(expand(args.contact_params, args.params), args.shapes.split(','), args.spam_params)
+    workload = WorkloadStats()
+    sim_stats = SimulatorStats()
+    stop = threading.Event()
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    simulator = None
+    if args.simulate:
+        url = args.ws_url or f"ws://127.0.0.1:{settings['ws']['listen_port']}/{settings['ws']['master_uuid']}"
+        master_uuid = url.rstrip('/').rsplit('/', 1)[-1]
+        simulator = asyncio.ensure_future(run_simulator(
+            url, master_uuid, devices=args.simulate, duration=args.duration + 2, stats=sim_stats, probe_interval=0,
+        ))
+        await asyncio.sleep(1)  # Let the apps bind before sending
+        if args.probe_interval:
+            probe = Probe(args.probe_param, args.probe_channel, args.probe_interval, sim_stats, workload)
+            threading.Thread(target=probe.run, args=(socket.socket(socket.AF_INET, socket.SOCK_DGRAM), address, stop), daemon=True).start()
+
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, generate, sock, address, streams, args.rate, args.spam_ratio, args.duration, workload, stop)
+    stop.set()
+    if simulator is not None:
+        await simulator
+
+    total = sum(workload.sent.values())
+    print(f"sent {total} messages in {workload.elapsed:.1f}s ({total / max(workload.elapsed, 1e-9):,.0f}/s, target {args.rate:,.0f}/s), "
+          f"{workload.sent}, max lag behind target {workload.max_lag * 1000:.1f}ms, probes lost {workload.probes_lost}")
+    if simulator is not None:
+        sim_stats.report(args.duration)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate synthetic OSC load against a local Shocking-VRChat server.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, help='OSC port, defaults to osc.listen_port of the local settings file')
+    parser.add_argument('--rate', type=float, default=1000, help='total messages per second')
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--params', type=int, default=8, help='number of contact params the shapes are spread across')
+    parser.add_argument('--contact-params', nargs='+', default=['/avatar/parameters/Shock/TouchAreaB', '/avatar/parameters/lms-penis-proximityA*'],
+                        help="mapped params to drive, a trailing '*' is expanded to numbered addresses")
+    parser.add_argument('--shapes', default='sweep,impact,oscillation', help=f'comma separated, from {list(SHAPES)}')
+    parser.add_argument('--spam-params', type=int, default=200, help='unrelated addresses for background spam')
+    parser.add_argument('--spam-ratio', type=float, default=0.8, help='share of the rate spent on background spam')
+    parser.add_argument('--simulate', type=int, default=0, help='connect this many simulated DG-Lab apps and time probes')
+    parser.add_argument('--ws-url', help='ws://host:port/<master_uuid>, defaults to the local settings file')
+    parser.add_argument('--probe-param', default='/avatar/parameters/Shock/TouchAreaA', help='param mapped only to the probe channel')
+    parser.add_argument('--probe-channel', default='A', choices=['A', 'B'])
+    parser.add_argument('--probe-interval', type=float, default=1.5, help='seconds between probes, 0 to disable')
+    args = parser.parse_args()
+    for shape in args.shapes.split(','):
+        if shape not in SHAPES:
+            parser.error(f'unknown shape {shape}')
+    if args.simulate and not args.ws_url and load_server_settings() is None:
+        parser.error('settings file not found, please pass --ws-url')
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -11,11 +11,19 @@ from websockets.server import serve as wsserve
 
 import srv
 from srv.connector.coyotev3ws import DGWSMessage, DGConnection
-from srv.handler.shock_handler import ShockHandler
+from srv.handler.shock_handler import ShockHandler, FEEDER_STATS
 from srv.handler.machine_handler import TuyaHandler, TuYaConnection
-
-from pythonosc.osc_server import AsyncIOOSCUDPServer
-from pythonosc.dispatcher import Dispatcher
+from srv.connector.machine_tuya_cloud import TUYA_CONNECTIONS
+from srv.runtime.timer_wheel import TIMERS
+from srv.runtime.latency import latency_summary, latency_reset
+from srv.runtime.loop_monitor import LOOP_MONITOR
+from srv.runtime.metrics import render_metrics, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from srv.runtime.profiler import PROFILER
+
+from srv.osc.router import OSCRouter
+from srv.osc.server import create_osc_server
+from srv.osc.mixer import ParamMixer
+from srv.osc.profiles import channel_router, build_routing
 
 app = Flask(__name__)
 
@@ -51,6 +59,12 @@ SETTINGS = {
     'SERVER_IP': None,
     'dglab3': {
         'channel_a': {
+            'feeder_mode': 'deadline', # deadline or poll
+            'derivative_method': 'streaming', # streaming or numpy
+            'resample_hz': 0, # 0 disables, e.g. 100 for a 100Hz input grid
+            'resample_delay': 0.03, # seconds of jitter buffer when resampling
+            'mix_mode': 'last', # last (last writer wins), max, sum or mean
+            'param_weights': {}, # avatar param -> weight when mix_mode is not last
             'mode_config':{
                 'shock': {
                     'duration': 2,
@@ -88,6 +102,12 @@ SETTINGS = {
             }
         },
         'channel_b': {
+            'feeder_mode': 'deadline', # deadline or poll
+            'derivative_method': 'streaming', # streaming or numpy
+            'resample_hz': 0, # 0 disables, e.g. 100 for a 100Hz input grid
+            'resample_delay': 0.03, # seconds of jitter buffer when resampling
+            'mix_mode': 'last', # last (last writer wins), max, sum or mean
+            'param_weights': {}, # avatar param -> weight when mix_mode is not last
             'mode_config':{
                 'shock': {
                     'duration': 2,
@@ -133,6 +153,12 @@ SETTINGS = {
     'osc':{
         'listen_host': '127.0.0.1',
         'listen_port': 9001,
+        'fast_path': True,
+        'batch_receive': False,
+        'avatar_profiles': {}, # avatar id -> {'channel_a': [params], 'channel_b': [params]}
+        'relay_ports': [], # forward raw OSC to other local apps, e.g. [9002] or ['127.0.0.1:9010']
+        'relay_prefixes': [], # only relay these address prefixes, empty relays everything
+        'record_path': None, # append received OSC datagrams to this file, replay with osc_replay.py
     },
     'web_server':{
         'listen_host': '127.0.0.1',
@@ -149,6 +175,7 @@ SETTINGS = {
     }
 }
 SERVER_IP = None
+osc_protocol = None
 
 @app.route('/get_ip')
 def get_current_ip():
@@ -216,11 +243,70 @@ async def api_v1_status():
     return {
         'healthy': 'ok',
         'devices': [
-            *[{"type": 'shock', 'device':'coyotev3', 'attr': {'strength':conn.strength, 'uuid':conn.uuid}} for conn in srv.WS_CONNECTIONS],
-            *[{"type": 'machine', 'device':'tuya', 'attr': {}} for conn in []], # TODO
-        ]
+            *[{"type": 'shock', 'device':'coyotev3', 'attr': {'strength':conn.strength, 'uuid':conn.uuid, 'outbound':conn.get_outbound_stats()}} for conn in list(srv.WS_CONNECTIONS)],
+            *[{"type": 'machine', 'device':'tuya', 'attr': {'level':conn.current_level, 'commands':conn.stats}} for conn in TUYA_CONNECTIONS],
+        ],
+        'feeder': FEEDER_STATS,
+        'timers': TIMERS.stats,
+        'ingest': [{
+            'handler': type(h).__name__, 'channel': getattr(h, 'channel', None), **h.ingest.stats,
+            'resample': h.resampler.stats if h.resampler is not None else None,
+        } for h in handlers],
+        'mixer': mixer.stats,
+        'osc': {
+            **osc_protocol.stats,
+            'relay': osc_protocol.relay.stats if osc_protocol.relay else None,
+            'recorder': osc_protocol.recorder.stats if osc_protocol.recorder else None,
+        } if hasattr(osc_protocol, 'relay') else None,
+        'routing': {'profile': dispatcher.active_profile, 'profiles': list(dispatcher.profiles), **dispatcher.stats},
+        'latency': latency_summary(),
+        'loop': LOOP_MONITOR.stats,
     }
 
+@app.route('/api/v1/loop')
+def api_v1_loop():
+    """Event loop lag, live tasks by coroutine and the rolling log of slow callbacks."""
+    return LOOP_MONITOR.snapshot()
+
+@app.route('/api/v1/profile', defaults={'action': 'status'})
+@app.route('/api/v1/profile/<action>')
+def api_v1_profile(action):
+    """Stage profiler status, trace downloads its spans as Chrome trace JSON."""
+    if action == 'trace':
+        return PROFILER.export(), 200, {'Content-Disposition': 'attachment; filename=shocking-vrchat-trace.json'}
+    if action != 'status':
+        return {'success': False, 'message': f'Unknown action {action}, start / stop / clear need POST.'}, 400
+    return PROFILER.status()
+
+@app.route('/api/v1/profile/<action>', methods=['POST'])
+def api_v1_profile_control(action):
+    """start / stop / clear the stage profiler."""
+    if action == 'start':
+        PROFILER.start()
+    elif action == 'stop':
+        PROFILER.stop()
+    elif action == 'clear':
+        PROFILER.clear()
+    else:
+        return {'success': False, 'message': f'Unknown action {action}.'}, 400
+    return PROFILER.status()
+
+@app.route('/metrics')
+def metrics():
+    return render_metrics(osc_protocol, dispatcher), 200, {'Content-Type': METRICS_CONTENT_TYPE}
+
+@app.route('/api/v1/latency')
+def api_v1_latency():
+    """Per channel OSC receive -> WebSocket write latency in ms."""
+    return latency_summary()
+
+@app.route('/api/v1/latency/reset', methods=['POST'])
+def api_v1_latency_reset():
+    """Return the current latency numbers and start a new measurement window."""
+    ret = latency_summary()
+    latency_reset()
+    return ret
+
 @app.route('/api/v1/shock/<channel>/<second>', endpoint='api_v1_shock')
 @allow_vrchat_only
 async def api_v1_shock(channel, second):
@@ -311,12 +397,15 @@ async def wshandler(connection):
     await client.serve()
 
 async def async_main():
+    LOOP_MONITOR.start()
     for handler in handlers:
         handler.start_background_jobs()
     try: 
-        server = AsyncIOOSCUDPServer((SETTINGS["osc"]["listen_host"], SETTINGS["osc"]["listen_port"]), dispatcher, asyncio.get_event_loop())
+        global osc_protocol
+        server = create_osc_server(SETTINGS['osc'], dispatcher, asyncio.get_event_loop())
         logger.success(f'OSC Listening: {SETTINGS["osc"]["listen_host"]}:{SETTINGS["osc"]["listen_port"]}')
         transport, protocol = await server.create_serve_endpoint()
+        osc_protocol = protocol
         # await wsserve(wshandler, "127.0.0.1", 8765)
     except Exception as e:
         logger.error(traceback.format_exc())
@@ -379,31 +468,39 @@ def config_init():
     logger.success("配置文件初始化完成，Websocket服务需要监听外来连接，如弹出防火墙提示，请点击允许访问。")
 
 def main():
-    global dispatcher, handlers
-    dispatcher = Dispatcher()
+    global dispatcher, handlers, mixer
+    dispatcher = OSCRouter()
+    mixer = ParamMixer()
     handlers = []
+    channel_routers = {}
+    default_params = {}
 
     for chann in ['A', 'B']:
         config_chann_name = f'channel_{chann.lower()}'
-        chann_mode = SETTINGS['dglab3'][config_chann_name]['mode']
+        chann_settings = SETTINGS['dglab3'][config_chann_name]
+        chann_mode = chann_settings['mode']
         shock_handler = ShockHandler(SETTINGS=SETTINGS, DG_CONN = DGConnection, channel_name=chann)
         handlers.append(shock_handler)
-        for param in SETTINGS['dglab3'][config_chann_name]['avatar_params']:
+        for param in chann_settings['avatar_params']:
             logger.success(f"Channel {chann} Mode：{chann_mode} Listening：{param}")
-            dispatcher.map(param, shock_handler.osc_handler)
+        channel_routers[config_chann_name] = channel_router(shock_handler, chann_settings, mixer)
+        default_params[config_chann_name] = chann_settings['avatar_params']
     
+    shared = []
     if 'machine' in SETTINGS and 'tuya' in SETTINGS['machine']:
         TuyaConn = TuYaConnection(
             access_id=SETTINGS['machine']['tuya']['access_id'],
             access_key=SETTINGS['machine']['tuya']['access_key'],
             device_ids=SETTINGS['machine']['tuya']['device_ids'],
+            api_endpoint=SETTINGS['machine']['tuya'].get('api_endpoint', "https://openapi.tuyacn.com"),
+            cmd_gap=SETTINGS['machine']['tuya'].get('cmd_gap', 0.2),
         )
         machine_tuya_handler = TuyaHandler(SETTINGS=SETTINGS, DEV_CONN=TuyaConn)
         handlers.append(machine_tuya_handler)
         for param in SETTINGS['machine']['tuya']['avatar_params']:
             logger.success(f"Machine Listening：{param}")
-            dispatcher.map(param, machine_tuya_handler.osc_handler)
-
+            shared.append((param, machine_tuya_handler.osc_handler))
+    build_routing(dispatcher, channel_routers, default_params, shared, SETTINGS['osc'].get('avatar_profiles'), mixer)
 
     th = Thread(target=async_main_wrapper, daemon=True)
     th.start()
@@ -1,9 +1,13 @@
-import json, uuid, traceback, asyncio, time
+import json, uuid, traceback, asyncio, time, collections
+from json.encoder import encode_basestring_ascii
 from loguru import logger
 import websockets
 from websockets.legacy.protocol import WebSocketCommonProtocol
 
 from srv import WS_CONNECTIONS, DEFAULT_WAVE #, WS_CONNECTIONS_ID_REVERSE, WS_BINDS
+from srv.runtime.timer_wheel import TIMERS
+from srv.runtime.latency import LATENCY
+from srv.runtime.profiler import PROFILER, perf_counter_ns
 
 # Global state for keep-alive heartbeat
 LAST_ACTIVITY_TIME = {'A': 0, 'B': 0}
@@ -14,6 +18,103 @@ KEEPALIVE_WAVE = '["0101010101010101"]'
 WAKEUP_POWER = 1
 WAKEUP_WAVE = '["0101010101010101"]'
 
+# Per-connection outbound queue, oldest messages are dropped when a slow device falls behind
+OUTBOUND_QUEUE_SIZE = 64
+
+class OutboundQueue():
+    """Per-connection coalescing priority queue.
+
+    Sent in order control > clear > strength > pulse > keepalive:
+    - control:   bind replies, relative strength changes, errors (FIFO)
+    - clear:     one pending clear per channel, drops the channel's pending pulses
+    - strength:  only the latest absolute strength per channel is kept
+    - pulse:     appended, oldest dropped when full, may carry a latency trace
+    - keepalive: heartbeat and idle keep-alive, superseded by real traffic on the channel
+    """
+    KINDS = ('control', 'clear', 'strength', 'pulse', 'keepalive')
+
+    def __init__(self, maxsize=OUTBOUND_QUEUE_SIZE) -> None:
+        self.maxsize = maxsize
+        self.control = collections.deque()
+        self.clear = {}       # channel -> msg
+        self.strength = {}    # channel -> msg
+        self.pulse = collections.deque()      # (channel, msg, trace)
+        self.keepalive = collections.deque()  # (channel, msg, None)
+        self.event = asyncio.Event()
+        self.stats = {
+            'queued': 0,
+            'sent': 0,
+            'dropped': 0,     # Overflow of the pulse / keepalive / control queues
+            'coalesced': 0,   # Superseded by a newer message before being sent
+            'max_depth': 0,
+            'bytes': 0,       # Written to the socket, messages are ASCII JSON
+            'by_kind': {kind: {'sent': 0, 'bytes': 0} for kind in self.KINDS},
+        }
+
+    def qsize(self):
+        return len(self.control) + len(self.clear) + len(self.strength) + len(self.pulse) + len(self.keepalive)
+
+    def _drop_channel(self, queue: collections.deque, channel):
+        kept = [item for item in queue if item[0] != channel]
+        self.stats['coalesced'] += len(queue) - len(kept)
+        queue.clear()
+        queue.extend(kept)
+
+    def _append_bounded(self, queue: collections.deque, item):
+        if len(queue) >= self.maxsize:
+            queue.popleft()
+            self.stats['dropped'] += 1
+        queue.append(item)
+
+    def put(self, msg: str, kind='control', channel=None, trace=None):
+        stats = self.stats
+        if channel is not None and kind != 'keepalive' and self.keepalive:
+            self._drop_channel(self.keepalive, channel)
+        if kind == 'strength':
+            if channel in self.strength:
+                stats['coalesced'] += 1
+            self.strength[channel] = msg
+        elif kind == 'pulse':
+            self._append_bounded(self.pulse, (channel, msg, trace))
+        elif kind == 'clear':
+            if self.pulse:
+                self._drop_channel(self.pulse, channel)
+            if channel in self.clear:
+                stats['coalesced'] += 1
+            self.clear[channel] = msg
+        elif kind == 'keepalive':
+            self._append_bounded(self.keepalive, (channel, msg, None))
+        else:
+            self._append_bounded(self.control, msg)
+        stats['queued'] += 1
+        depth = self.qsize()
+        if depth > stats['max_depth']:
+            stats['max_depth'] = depth
+        self.event.set()
+
+    def get_nowait(self):
+        """(msg, kind, trace) of the next message to send, or None when empty."""
+        if self.control:
+            return self.control.popleft(), 'control', None
+        if self.clear:
+            return self.clear.pop(next(iter(self.clear))), 'clear', None
+        if self.strength:
+            return self.strength.pop(next(iter(self.strength))), 'strength', None
+        if self.pulse:
+            _, msg, trace = self.pulse.popleft()
+            return msg, 'pulse', trace
+        if self.keepalive:
+            return self.keepalive.popleft()[1], 'keepalive', None
+        return None
+
+    async def get(self):
+        while 1:
+            item = self.get_nowait()
+            if item is not None:
+                return item
+            self.event.clear()
+            await self.event.wait()
+
 class DGWSMessage():
     HEARTBEAT = json.dumps({'type': 'heartbeat', 'clientId': '', 'targetId': '', 'message': '200'})
     def __init__(self, type, clientId="", targetId="", message="") -> None:
@@ -29,10 +130,18 @@ class DGWSMessage():
             'targetId': self.targetId,
             'message': str(self.message),
         })
-    async def send(self, conn):
-        msg = self.__str__()
-        ret = await conn.ws_conn.send(msg)
-        return ret
+    async def send(self, conn, kind='control', channel=None):
+        # Only enqueues, the connection's writer task does the socket write
+        return conn.enqueue(self.__str__(), kind=kind, channel=channel)
+
+    @staticmethod
+    def template(type, clientId="", targetId=""):
+        """Serialized prefix of a message up to the `message` value, same output as __str__."""
+        return json.dumps({'type': type, 'clientId': clientId, 'targetId': targetId, 'message': ''})[:-3]
+
+    @staticmethod
+    def render(template: str, message: str) -> str:
+        return template + encode_basestring_ascii(message) + '}'
 
 class DGConnection():
     def __init__(self, ws_connection: WebSocketCommonProtocol, client_uuid=None, SETTINGS:dict=None) -> None:
@@ -53,11 +162,65 @@ class DGConnection():
         self.strength_max   = {'A':0, 'B':0}
         self.strength_limit = {'A':limit_a, 'B':limit_b}
 
+        self.outbound = OutboundQueue()
+
+        # Pre-serialized messages, type/clientId/targetId never change for a connection
+        self.msg_template = DGWSMessage.template('msg', self.master_uuid, self.uuid)
+        self.strength_msgs = {
+            (channel, value): DGWSMessage.render(self.msg_template, f"strength-{'1' if channel == 'A' else '2'}+2+{value}")
+            for channel in ['A', 'B'] for value in range(201)
+        }
+        self.clear_msgs = {
+            channel: DGWSMessage.render(self.msg_template, f"clear-{'1' if channel == 'A' else '2'}")
+            for channel in ['A', 'B']
+        }
+
         WS_CONNECTIONS.add(self)
         # WS_CONNECTIONS_ID_REVERSE[self.uuid] = self
     
     def __str__(self):
         return f"<DGConnection (id:{self.uuid}, {self.strength}, max {self.strength_max})>"
+
+    def enqueue(self, msg: str, kind='control', channel=None, trace=None):
+        """Queue a serialized message for the writer task, never blocks."""
+        self.outbound.put(msg, kind=kind, channel=channel, trace=trace)
+        return True
+
+    def get_outbound_stats(self):
+        return {**self.outbound.stats, 'depth': self.outbound.qsize()}
+
+    async def outbound_writer(self):
+        """Drain the outbound queue to the socket, one slow device only delays itself."""
+        stats = self.outbound.stats
+        try:
+            while 1:
+                msg, kind, trace = await self.outbound.get()
+                if PROFILER.enabled:
+                    start = perf_counter_ns()
+                    await self.ws_conn.send(msg)
+                    PROFILER.record('ws_send', start)
+                else:
+                    await self.ws_conn.send(msg)
+                stats['sent'] += 1
+                stats['bytes'] += len(msg)
+                by_kind = stats['by_kind'][kind]
+                by_kind['sent'] += 1
+                by_kind['bytes'] += len(msg)
+                if trace is not None:
+                    # (channel, frame created, [OSC receive times])
+                    channel, created, origins = trace
+                    now = time.time()
+                    stages = LATENCY[channel]
+                    stages['outbound'].add(now - created)
+                    total = stages['total']
+                    for t in origins:
+                        total.add(now - t)
+        except websockets.ConnectionClosed:
+            pass
+        except Exception:
+            # Without its writer the connection would queue frames forever, drop it instead
+            logger.error(f'Device {self.uuid[:8]} outbound writer failed, closing: {traceback.format_exc()}')
+            await self.ws_conn.close(code=1011)
     
     async def msg_handler(self, msg: DGWSMessage):
         if msg.type == 'bind':
@@ -85,7 +248,7 @@ class DGConnection():
     def get_upper_strength(self, channel='A'):
         return min(self.strength_max[channel], self.strength_limit[channel])
 
-    async def set_strength(self, channel='A', mode='2', value=0, force=False, allow_exceed=False):
+    async def set_strength(self, channel='A', mode='2', value=0, force=False, allow_exceed=False, kind='strength'):
         if not force:
             if value < 0 or value > 200:
                 raise ValueError()
@@ -104,8 +267,12 @@ class DGConnection():
                 LAST_ACTIVITY_TIME[channel] = time.time()
         if mode == '2':
             self.strength[channel] = value
-        msg = DGWSMessage('msg', self.master_uuid, self.uuid, f"strength-{'1' if channel == 'A' else '2'}+{mode}+{value}")
-        await msg.send(self)
+        msg = self.strength_msgs.get((channel, value)) if mode == '2' else None
+        if msg is None:
+            msg = DGWSMessage.render(self.msg_template, f"strength-{'1' if channel == 'A' else '2'}+{mode}+{value}")
+        if mode != '2' and kind == 'strength':
+            kind = 'control'  # Relative changes can't be coalesced
+        self.enqueue(msg, kind=kind, channel=channel)
 
     async def set_strength_0_to_1(self, channel='A', value=0):
         if value < 0 or value > 1:
@@ -123,45 +290,41 @@ class DGConnection():
         strength = int(effective_limit * value_0_to_1)
         await self.set_strength(channel=channel, mode='2', value=strength, allow_exceed=allow_exceed)
 
-    async def send_wave(self, channel='A', wavestr=DEFAULT_WAVE):
+    async def send_wave(self, channel='A', wavestr=DEFAULT_WAVE, kind='pulse', trace=None):
         # Update activity time to prevent keep-alive during active usage
         LAST_ACTIVITY_TIME[channel] = time.time()
-        msg = DGWSMessage('msg', self.master_uuid, self.uuid, f"pulse-{channel}:{wavestr}")
-        await msg.send(self)
+        msg = DGWSMessage.render(self.msg_template, f"pulse-{channel}:{wavestr}")
+        self.enqueue(msg, kind=kind, channel=channel, trace=trace)
     
     async def clear_wave(self, channel='A'):
-        channel = '1' if channel == 'A' else '2'
-        msg = DGWSMessage('msg', self.master_uuid, self.uuid, f"clear-{channel}")
-        await msg.send(self)
+        self.enqueue(self.clear_msgs[channel], kind='clear', channel=channel)
     
     async def send_err(self, type=''):
         msg = DGWSMessage(type, )
     
     async def heartbeat(self):
-        while 1:
-            await asyncio.sleep(60)
-            await self.ws_conn.send(DGWSMessage.HEARTBEAT)
+        # Runs every 60s on the shared timer wheel
+        self.enqueue(DGWSMessage.HEARTBEAT, kind='keepalive')
     
     async def device_keepalive(self):
         """Send periodic low-power pulse to prevent device from sleeping when idle"""
-        while 1:
-            await asyncio.sleep(KEEPALIVE_INTERVAL)
-            current_time = time.time()
+        # Runs every KEEPALIVE_INTERVAL on the shared timer wheel
+        current_time = time.time()
+        
+        for channel in ['A', 'B']:
+            # Check if channel has been idle long enough
+            last_activity = LAST_ACTIVITY_TIME.get(channel, 0)
+            idle_time = current_time - last_activity
             
-            for channel in ['A', 'B']:
-                # Check if channel has been idle long enough
-                last_activity = LAST_ACTIVITY_TIME.get(channel, 0)
-                idle_time = current_time - last_activity
-                
-                if idle_time >= KEEPALIVE_INTERVAL:
-                    # Send very low power keep-alive signal
-                    try:
-                        # Set minimal strength (1 out of 200)
-                        await self.set_strength(channel, mode='2', value=KEEPALIVE_POWER, force=True)
-                        # Send minimal wave pattern
-                        await self.send_wave(channel, wavestr=KEEPALIVE_WAVE)
-                    except Exception:
-                        pass
+            if idle_time >= KEEPALIVE_INTERVAL:
+                # Send very low power keep-alive signal
+                try:
+                    # Set minimal strength (1 out of 200)
+                    await self.set_strength(channel, mode='2', value=KEEPALIVE_POWER, force=True, kind='keepalive')
+                    # Send minimal wave pattern
+                    await self.send_wave(channel, wavestr=KEEPALIVE_WAVE, kind='keepalive')
+                except Exception:
+                    pass
     
     async def connection_init(self):
         await asyncio.sleep(2)
@@ -172,12 +335,13 @@ class DGConnection():
 
     async def serve(self):
         logger.success(f'New WebSocket connection: Device {self.uuid[:8]}... (total: {len(WS_CONNECTIONS)})')
+        writer = asyncio.ensure_future(self.outbound_writer())
         msg = DGWSMessage('bind', clientId=str(self.uuid), targetId='', message='targetId')
         await msg.send(self)
         asyncio.create_task(self.connection_init())
         try:
-            hb = asyncio.ensure_future(self.heartbeat())
-            keepalive = asyncio.ensure_future(self.device_keepalive())
+            hb = TIMERS.call_every(60, self.heartbeat, name=f'heartbeat-{self.uuid[:8]}')
+            keepalive = TIMERS.call_every(KEEPALIVE_INTERVAL, self.device_keepalive, name=f'keepalive-{self.uuid[:8]}')
             async for message in self.ws_conn:
                 event = json.loads(message)
                 msg = DGWSMessage(**event)
@@ -191,30 +355,31 @@ class DGConnection():
             logger.warning(f'Device {self.uuid[:8]} disconnected (remaining: {len(WS_CONNECTIONS) - 1})')
             hb.cancel()
             keepalive.cancel()
-            WS_CONNECTIONS.remove(self)
+            writer.cancel()
+            WS_CONNECTIONS.discard(self)
 
     @classmethod
-    async def broadcast_wave(cls, channel='A', wavestr=DEFAULT_WAVE):
-        for conn in WS_CONNECTIONS:
+    async def broadcast_wave(cls, channel='A', wavestr=DEFAULT_WAVE, trace=None):
+        for conn in list(WS_CONNECTIONS):
             conn : cls
-            await conn.send_wave(channel=channel, wavestr=wavestr)
+            await conn.send_wave(channel=channel, wavestr=wavestr, trace=trace)
 
     @classmethod
     async def broadcast_clear_wave(cls, channel='A'):
-        for conn in WS_CONNECTIONS:
+        for conn in list(WS_CONNECTIONS):
             conn : cls
             await conn.clear_wave(channel=channel)
     
     @classmethod
     async def broadcast_strength_0_to_1(cls, channel='A', value=0):
-        for conn in WS_CONNECTIONS:
+        for conn in list(WS_CONNECTIONS):
             conn : cls
             await conn.set_strength_0_to_1(channel=channel, value=value)
     
     @classmethod
     async def broadcast_strength_with_limit(cls, channel='A', value_0_to_1=0, device_limit=100, allow_exceed=False):
         """Set strength with a specific device limit (ignores connection strength_limit)"""
-        for conn in WS_CONNECTIONS:
+        for conn in list(WS_CONNECTIONS):
             conn : cls
             await conn.set_strength_with_limit(channel=channel, value_0_to_1=value_0_to_1, device_limit=device_limit, allow_exceed=allow_exceed)
     
@@ -231,6 +396,6 @@ class DGConnection():
     @classmethod
     async def broadcast_wakeup_pulse(cls, channel='A'):
         """Send wake-up pulse to all connected devices"""
-        for conn in WS_CONNECTIONS:
+        for conn in list(WS_CONNECTIONS):
             conn : cls
             await conn.send_wakeup_pulse(channel=channel)
\ No newline at end of file
@@ -1,10 +1,71 @@
-import time
+import time, asyncio, threading, traceback
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from loguru import logger
+from requests.adapters import HTTPAdapter
 from tuya_connector import (
 	TuyaOpenAPI,
 	TuyaOpenPulsar,
 	TuyaCloudPulsarTopic,
 )
+from tuya_connector.openapi import TO_B_REFRESH_TOKEN_API, TuyaTokenInfo
+
+from srv.runtime.timer_wheel import TIMERS
+from srv.runtime.latency import LatencySketch
+from srv.runtime.profiler import profiled
+
+TUYA_CONNECTIONS = []
+
+# Refresh this long before expiry, ahead of the SDK's own 60s check so it never
+# gets to refresh concurrently from several pool threads
+TOKEN_REFRESH_MARGIN = 120
+
+# Commands where only the latest value matters, rate limited per device
+COALESCED_CODES = ('level', 'mode')
+
+class TokenBucket():
+    def __init__(self, rate, capacity=1) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_take(self):
+        self.refill(time.monotonic())
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def wait_time(self):
+        """Seconds until the next token is available."""
+        self.refill(time.monotonic())
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+class PooledTuyaOpenAPI(TuyaOpenAPI):
+    """TuyaOpenAPI shared by a thread pool, one thread refreshes an expiring token while the others wait."""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.refresh_lock = threading.Lock()
+
+    def refresh_token_if_needed(self):
+        with self.refresh_lock:
+            if not self.is_connect():
+                return
+            if self.token_info.expire_time - TOKEN_REFRESH_MARGIN * 1000 > int(time.time() * 1000):
+                return
+            # Token endpoints are signed without the access token
+            self.token_info.access_token = ''
+            response = self.get(TO_B_REFRESH_TOKEN_API.format(self.token_info.refresh_token))
+            self.token_info = TuyaTokenInfo(response)
+
+    def post(self, path, body=None):
+        self.refresh_token_if_needed()
+        return super().post(path, body)
 
 class TuYaConnection():
     def __init__(
@@ -15,36 +76,120 @@ class TuYaConnection():
             api_endpoint= "https://openapi.tuyacn.com", 
             mq_endpoint="wss://mqe.tuyacn.com:8285/", 
             cmd_gap=0.2,
+            cmd_burst=1,
+            max_workers=None,
         ) -> None:
-        self.tyapi = TuyaOpenAPI(api_endpoint, access_id, access_key)
+        self.tyapi = PooledTuyaOpenAPI(api_endpoint, access_id, access_key)
+        # Blocking HTTP calls run on this pool, never on the event loop
+        max_workers = max_workers or max(4, len(device_ids))
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='tuya')
+        # Keep-alive connection pool sized for concurrent fan-out across devices
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.tyapi.session.mount('https://', adapter)
+        self.tyapi.session.mount('http://', adapter)
         self.tyapi.connect()
-        self.last_cmd_time = 0
         self.cmd_gap = cmd_gap
         self.device_ids = device_ids
         self.mq_endpoint = mq_endpoint
+
+        # Per-device token bucket, latest pending value per code, one request in flight
+        self.buckets     = {device_id: TokenBucket(1 / cmd_gap, cmd_burst) for device_id in device_ids}
+        self.pending     = {device_id: {} for device_id in device_ids}
+        self.in_flight   = {device_id: False for device_id in device_ids}
+        self.flush_timers = {
+            device_id: TIMERS.timer(partial(self.dispatch, device_id), name=f'tuya-flush-{device_id}')
+            for device_id in device_ids
+        }
+        self.stats = {
+            'sent': 0,
+            'failed': 0,      # Request raised or the API did not report success
+            'coalesced': 0,   # Superseded by a newer value before being sent
+            'throttled': 0,   # Had to wait for a token or an in-flight request
+        }
+        # Command submitted to the pool -> HTTP response, per device request
+        self.latency = LatencySketch()
+
         self.set_switch(True)
         self.current_level = 1
+        TUYA_CONNECTIONS.append(self)
     
     def __del__(self):
         self.set_switch(False)
 
-    async def sendcmd(self, code, value):
-        curr_time = time.time()
-        if curr_time - self.last_cmd_time < self.cmd_gap and code in ['level', 'mode']:
-            pass
-        for device_id in self.device_ids:
+    def post_command(self, device_id, code, value):
+        try:
             resp = self.tyapi.post(f"/v1.0/iot-03/devices/{device_id}/commands", {"commands":[{"code":code,"value":value}]})
-            if resp.get('success') != True:
-                logger.error(f"{resp}")
+        except Exception:
+            logger.error(traceback.format_exc())
+            return None
+        if resp is None or resp.get('success') != True:
+            logger.error(f"{resp}")
+        return resp
+
+    def dispatch(self, device_id):
+        """Send the device's next pending command if nothing is in flight and a token is available."""
+        pending = self.pending[device_id]
+        if not pending or self.in_flight[device_id]:
+            return
+        bucket = self.buckets[device_id]
+        if not bucket.try_take():
+            self.flush_timers[device_id].rearm(bucket.wait_time())
+            return
+        code = next(iter(pending))
+        value = pending.pop(code)
+        self.in_flight[device_id] = True
+        future = self.submit(device_id, code, value)
+        future.add_done_callback(partial(self.on_command_done, device_id))
+
+    @staticmethod
+    def command_ok(resp):
+        return resp is not None and resp.get('success') == True
+
+    def count_result(self, ok):
+        self.stats['sent' if ok else 'failed'] += 1
+
+    def on_command_done(self, device_id, future):
+        self.in_flight[device_id] = False
+        if future.cancelled() or future.exception() is not None:
+            self.count_result(False)
+        else:
+            self.count_result(self.command_ok(future.result()))
+        self.dispatch(device_id)
+
+    def submit(self, device_id, code, value):
+        """Run post_command on the pool, its latency is recorded when the future completes."""
+        started = time.monotonic()
+        future = asyncio.get_running_loop().run_in_executor(self.executor, self.post_command, device_id, code, value)
+        # Done callbacks run on the loop thread, the sketch is never touched by pool threads
+        future.add_done_callback(lambda _: self.latency.add(time.monotonic() - started))
+        return future
+
+    @profiled('TuYaConnection.sendcmd')
+    async def sendcmd(self, code, value):
+        if code in COALESCED_CODES:
+            # Only keep the latest value, superseded ones are never sent
+            for device_id in self.device_ids:
+                pending = self.pending[device_id]
+                if code in pending:
+                    self.stats['coalesced'] += 1
+                    pending[code] = value
+                    continue
+                pending[code] = value
+                self.dispatch(device_id)
+                if code in pending:
+                    self.stats['throttled'] += 1
+            return
+        # Concurrent fan-out on the thread pool, the event loop only awaits the results
+        results = await asyncio.gather(*[
+            self.submit(device_id, code, value)
+            for device_id in self.device_ids
+        ], return_exceptions=True)
+        for resp in results:
+            self.count_result(not isinstance(resp, BaseException) and self.command_ok(resp))
 
     def sendcmd_sync(self, code, value):
-        curr_time = time.time()
-        if curr_time - self.last_cmd_time < self.cmd_gap and code in ['level', 'mode']:
-            pass
         for device_id in self.device_ids:
-            resp = self.tyapi.post(f"/v1.0/iot-03/devices/{device_id}/commands", {"commands":[{"code":code,"value":value}]})
-            if resp.get('success') != True:
-                logger.error(f"{resp}")
+            self.post_command(device_id, code, value)
     
     def set_switch(self, switch:bool=True):
         self.sendcmd_sync('switch', switch)
@@ -1,9 +1,14 @@
 from loguru import logger
-import asyncio
+import time
+from ..runtime.profiler import profiled
 
 class BaseHandler():
+    # Latest-value slots every handler sets up, consumed on the handler's own tick
+    ingest = None
+    resampler = None
     
     @staticmethod
+    @profiled('param_sanitizer')
     def param_sanitizer(param):
         try:
             param = param[0]
@@ -22,4 +27,28 @@ class BaseHandler():
     def osc_handler(self, address, *args):
         # logger.debug(f"VRCOSC: CHANN {self.channel}: {address}: {args}")
         val = self.param_sanitizer(args)
-        return asyncio.ensure_future(self._handler(val))
\ No newline at end of file
+        return self.osc_value_handler(address, val)
+
+    @profiled('osc_value_handler')
+    def osc_value_handler(self, address, val, t=None):
+        """Handle an already sanitized value, called directly by the raw OSC fast path."""
+        # Synchronous write into the address slot, feeders consume it at tick time
+        if t is None:
+            t = time.time()
+        self.clear_after(self.sample_timeout)
+        if self.resampler is not None:
+            # Repeated values still matter for interpolation
+            self.resampler.push(address, t, val)
+        if self.ingest.write(address, val, t):
+            self.on_sample()
+
+    def on_sample(self):
+        pass
+
+    def consume_samples(self):
+        samples = self.ingest.consume()
+        if self.resampler is not None:
+            samples = self.resampler.pull(time.time())
+        for t, val in samples:
+            self.apply_sample(val, t)
+        return samples
\ No newline at end of file
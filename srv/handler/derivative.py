@@ -0,0 +1,73 @@
+class StreamingDerivative():
+    """O(1) incremental replacement for ShockHandler.compute_derivative.
+
+    The numpy method smooths the whole history with a 3-sample moving average and
+    runs np.gradient three times, but only the last element of each pass is used.
+    Those only depend on the last 4 smoothed values (= last 6 raw samples), so this
+    keeps a preallocated 6-sample ring buffer and re-evaluates the same formulas on
+    that tail whenever a sample is appended.
+    """
+    WINDOW = 3
+    TAIL = 4
+    SIZE = TAIL + WINDOW - 1
+
+    def __init__(self) -> None:
+        self.times = [0.0] * self.SIZE
+        self.dists = [0.0] * self.SIZE
+        self.pos = 0
+        self.count = 0
+        self.result = (0, 0, 0, 0)
+
+    def __len__(self):
+        return self.count
+
+    def reset(self):
+        self.pos = 0
+        self.count = 0
+        self.result = (0, 0, 0, 0)
+
+    def append(self, t, distance):
+        last = (self.pos - 1) % self.SIZE
+        if self.count and t <= self.times[last]:
+            # Non-increasing timestamp would divide by zero, keep latest value only
+            self.dists[last] = distance
+        else:
+            self.times[self.pos] = t
+            self.dists[self.pos] = distance
+            self.pos = (self.pos + 1) % self.SIZE
+            self.count += 1
+        if self.count >= 4:
+            self.result = self._compute()
+        return self.result
+
+    def values(self):
+        """(distance, velocity, acceleration, jerk) of the latest sample."""
+        return self.result
+
+    def _compute(self):
+        n = min(self.count, self.SIZE)
+        start = self.pos - n
+        times = [self.times[(start + i) % self.SIZE] for i in range(n)]
+        dists = [self.dists[(start + i) % self.SIZE] for i in range(n)]
+
+        # Moving average (np.convolve 'valid'), paired with the leading timestamps like the numpy method
+        distance = [sum(dists[i:i + self.WINDOW]) / self.WINDOW for i in range(n - self.WINDOW + 1)]
+        time_ = times[:len(distance)]
+
+        velocity = self.gradient(distance, time_)
+        acceleration = self.gradient(velocity, time_)
+        jerk = self.gradient(acceleration, time_)
+        return distance[-1], velocity[-1], acceleration[-1], jerk[-1]
+
+    @staticmethod
+    def gradient(f, t):
+        """np.gradient(f, t) with edge_order=1 for short, non-uniform sequences."""
+        n = len(f)
+        ret = [0.0] * n
+        ret[0] = (f[1] - f[0]) / (t[1] - t[0])
+        ret[-1] = (f[-1] - f[-2]) / (t[-1] - t[-2])
+        for i in range(1, n - 1):
+            hs = t[i] - t[i - 1]
+            hd = t[i + 1] - t[i]
+            ret[i] = (hs * hs * f[i + 1] + (hd * hd - hs * hs) * f[i] - hd * hd * f[i - 1]) / (hs * hd * (hd + hs))
+        return ret
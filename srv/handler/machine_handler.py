@@ -1,5 +1,7 @@
 from . base_handler import BaseHandler
 from ..connector.machine_tuya_cloud import TuYaConnection
+from ..runtime.timer_wheel import TIMERS
+from ..osc.ingest import SampleSlots
 import asyncio, time, math
 
 class TuyaHandler(BaseHandler):
@@ -11,42 +13,43 @@ class TuyaHandler(BaseHandler):
 
         self.mode = self.settings['mode']
         
-        if self.mode == 'level':
-            self._handler = self.handler_level
-        else:
+        if self.mode != 'level':
             raise ValueError(f"Not supported mode: {self.mode}")
         
         self.distance_update_time_window = 0.2
         self.distance_current_strength = 0
+        self.distance_last_level = 0
 
         self.to_clear_time    = 0
         self.is_cleared       = True
+        self.clear_timer      = None
+
+        # Latest value per OSC address, consumed by the level feeder on every tick
+        self.ingest = SampleSlots()
+        self.sample_timeout = 5
     
     def start_background_jobs(self):
         # logger.info(f"Channel: {self.channel}, background job started.")
-        asyncio.ensure_future(self.clear_check())
+        self.clear_timer = TIMERS.timer(self.clear_check, name='tuya-clear')
         if self.mode == 'level':
-            asyncio.ensure_future(self.distance_background_wave_feeder())
+            TIMERS.call_every(self.distance_update_time_window, self.distance_background_wave_feeder, name='tuya-level')
 
 
     async def clear_check(self):
-        # logger.info(f'Channel {self.channel} started clear check.')
-        sleep_time = 0.05
-        while 1:
-            await asyncio.sleep(sleep_time)
-            current_time = time.time()
-            # logger.debug(f"{str(self.is_cleared)}, {current_time}, {self.to_clear_time}")
-            if not self.is_cleared and current_time > self.to_clear_time:
-                self.is_cleared = True
-                self.level_current = 1
-                await self.DEV_CONN.set_level(1)
+        # Fired by clear_timer once no sample arrived for the clear-after period
+        if not self.is_cleared:
+            self.is_cleared = True
+            self.level_current = 1
+            # Don't hold up the shared timer wheel on the HTTP round trip
+            asyncio.ensure_future(self.DEV_CONN.set_level(1))
 
-    async def set_clear_after(self, val):
+    def clear_after(self, val):
         self.is_cleared = False
         self.to_clear_time = time.time() + val
+        if self.clear_timer is not None:
+            self.clear_timer.rearm(val)
 
-    async def handler_level(self, distance):
-        await self.set_clear_after(5)
+    def apply_sample(self, distance, t):
         strength = 0
         trigger_bottom = self.mode_config['trigger_range']['bottom']
         trigger_top = self.mode_config['trigger_range']['top']
@@ -60,19 +63,11 @@ class TuyaHandler(BaseHandler):
         self.distance_current_strength = strength
 
     async def distance_background_wave_feeder(self):
-        tick_time_window = self.distance_update_time_window / 20
-        next_tick_time   = 0
-        last_level    = 0
-        while 1:
-            current_time = time.time()
-            if current_time < next_tick_time:
-                await asyncio.sleep(tick_time_window)
-                continue
-            next_tick_time = current_time + self.distance_update_time_window
-            current_strength = self.distance_current_strength
-            current_level = math.ceil(self.mode_config['level_max'] * current_strength)
-            if last_level == current_level:
-                continue
-            last_level = current_level
-            await self.DEV_CONN.set_level(current_level)
-    
\ No newline at end of file
+        # Runs every distance_update_time_window on the shared timer wheel
+        self.consume_samples()
+        current_strength = self.distance_current_strength
+        current_level = math.ceil(self.mode_config['level_max'] * current_strength)
+        if self.distance_last_level == current_level:
+            return
+        self.distance_last_level = current_level
+        asyncio.ensure_future(self.DEV_CONN.set_level(current_level))
@@ -2,10 +2,17 @@ import numpy as np
 import collections
 import random
 from .base_handler import BaseHandler
-import time, asyncio, math, json
+from .derivative import StreamingDerivative
+from .wave_encoder import encode_wave_frame
+import time, asyncio, math
 from loguru import logger
 
 from ..connector.coyotev3ws import DGConnection
+from ..runtime.timer_wheel import TIMERS
+from ..runtime.latency import LATENCY
+from ..runtime.profiler import PROFILER
+from ..osc.ingest import SampleSlots
+from ..osc.resampler import Resampler
 
 
 # Global power visualizer data - read by GUI for real-time display
@@ -39,6 +46,21 @@ POWER_VISUALIZER_DATA = {
 }
 
 
+# Wave feeder scheduler statistics - read by status API / GUI
+FEEDER_STATS = {
+    channel: {
+        'mode': 'deadline',
+        'ticks': 0,           # Frames evaluated
+        'wakeups': 0,         # Times the feeder coroutine resumed
+        'parks': 0,           # Times the feeder parked on an idle channel
+        'overruns': 0,        # Deadlines missed by more than one frame
+        'drift_last_ms': 0.0, # Lateness of the last tick vs its deadline
+        'drift_max_ms': 0.0,
+        'drift_sum_ms': 0.0,
+    } for channel in ['A', 'B']
+}
+
+
 # Global runtime settings that can be updated from GUI
 RUNTIME_PATTERN_SETTINGS = {
     'A': {
@@ -81,18 +103,31 @@ class ShockHandler(BaseHandler):
         self.shock_settings = SETTINGS['dglab3'][f'channel_{channel_name.lower()}']
         self.mode_config    = self.shock_settings['mode_config']
 
-        # Always use unified handler for real-time pattern switching
-        self._handler = self.handler_unified
-        
         self.bg_wave_update_time_window = 0.1
         self.bg_wave_current_strength = 0
         self.bg_wave_base_strength = 0  # Base strength from distance
         self.bg_wave_boost_strength = 0  # Boost from velocity/acceleration
 
         self.touch_dist_arr = collections.deque(maxlen=20)
+        # 'streaming': O(1) update on every sample. 'numpy': rebuild arrays on every tick.
+        self.derivative_method = self.shock_settings.get('derivative_method', 'streaming')
+        self.derivative = StreamingDerivative()
 
         self.to_clear_time    = 0
         self.is_cleared       = True
+
+        # Latest value per OSC address, consumed by the wave feeder on every tick
+        self.ingest = SampleSlots()
+        self.sample_timeout = 0.5
+        # Optional fixed-rate grid between ingest and the pattern math, 0 disables it
+        resample_hz = self.shock_settings.get('resample_hz', 0)
+        if resample_hz:
+            self.resampler = Resampler(rate=resample_hz, delay=self.shock_settings.get('resample_delay', 0.03))
+
+        # 'deadline': sleep until next frame, park when idle. 'poll': legacy 5ms polling.
+        self.feeder_mode = self.shock_settings.get('feeder_mode', 'deadline')
+        self.sample_event = None  # Created on the server loop in start_background_jobs
+        self.clear_timer = None
     
     def get_runtime_settings(self):
         """Get current runtime pattern settings for this channel"""
@@ -113,26 +148,30 @@ class ShockHandler(BaseHandler):
     
     def start_background_jobs(self):
         # logger.info(f"Channel: {self.channel}, background job started.")
-        asyncio.ensure_future(self.clear_check())
+        self.sample_event = asyncio.Event()
+        self.clear_timer = TIMERS.timer(self.clear_check, name=f'shock-clear-{self.channel}')
         # Unified background wave feeder handles all patterns
         asyncio.ensure_future(self.unified_background_wave_feeder())
 
     def osc_handler(self, address, *args):
         val = self.param_sanitizer(args)
-        asyncio.ensure_future(self._handler(val))
+        self.osc_value_handler(address, val)
+
+    def on_sample(self):
+        # Wake up a parked feeder
+        if self.sample_event is not None:
+            self.sample_event.set()
 
     async def clear_check(self):
-        # logger.info(f'Channel {self.channel} started clear check.')
-        sleep_time = 0.05
-        while 1:
-            await asyncio.sleep(sleep_time)
-            current_time = time.time()
-            # logger.debug(f"{str(self.is_cleared)}, {current_time}, {self.to_clear_time}")
-            if not self.is_cleared and current_time > self.to_clear_time:
-                self.is_cleared = True
-                self.bg_wave_current_strength = 0
-                self.touch_dist_arr.clear()
-                await self.DG_CONN.broadcast_clear_wave(self.channel)
+        # Fired by clear_timer once no sample arrived for the clear-after period
+        if not self.is_cleared:
+            self.is_cleared = True
+            self.bg_wave_current_strength = 0
+            self.touch_dist_arr.clear()
+            self.derivative.reset()
+            if self.resampler is not None:
+                self.resampler.reset()
+            await self.DG_CONN.broadcast_clear_wave(self.channel)
     
     async def feed_wave(self):
         raise NotImplemented
@@ -141,21 +180,17 @@ class ShockHandler(BaseHandler):
             await asyncio.sleep(sleep_time)
             await self.DG_CONN.broadcast_wave(channel=self.channel, wavestr=self.shock_settings['shock_wave'])
 
-    async def set_clear_after(self, val):
+    def clear_after(self, val):
         self.is_cleared = False
         self.to_clear_time = time.time() + val
+        if self.clear_timer is not None:
+            self.clear_timer.rearm(val)
 
     @staticmethod
     def generate_wave_100ms(freq, from_, to_):
         assert 0 <= from_ <= 1, "Invalid wave generate."
         assert 0 <= to_   <= 1, "Invalid wave generate."
-        from_ = int(100*from_)
-        to_   = int(100*to_)
-        ret = ["{:02X}".format(freq)]*4
-        delta = (to_ - from_) // 4
-        ret += ["{:02X}".format(min(max(from_ + delta*i, 0),100)) for i in range(1,5,1)]
-        ret = ''.join(ret)
-        return json.dumps([ret],separators=(',', ':'))
+        return encode_wave_frame(freq, int(100*from_), int(100*to_))
     
     def normalize_distance(self, distance):
         out_distance = 0
@@ -170,19 +205,17 @@ class ShockHandler(BaseHandler):
             out_distance = 1 if out_distance > 1 else out_distance
         return out_distance
 
-    async def handler_unified(self, distance):
-        """Unified handler that tracks both distance and derivatives for all patterns"""
-        await self.set_clear_after(0.5)
+    def apply_sample(self, distance, t):
         out_distance = self.normalize_distance(distance)
         self.bg_wave_base_strength = out_distance
         
         # Always track distance history for derivative computation
         if out_distance > 0:
-            t = time.time()
             self.touch_dist_arr.append([t, out_distance])
+            self.derivative.append(t, out_distance)
 
     async def handler_distance(self, distance):
-        await self.set_clear_after(0.5)
+        self.clear_after(0.5)
         self.bg_wave_current_strength = self.normalize_distance(distance)
 
     async def unified_background_wave_feeder(self):
@@ -200,13 +233,49 @@ class ShockHandler(BaseHandler):
         boost_peak = 0.0          # Peak value of the current boost (for decay calc)
         boost_trigger_time = 0.0  # When the last boost was triggered
         zero_time = 0.0           # How long signal has been zero (for fast reset)
+
+        stats = FEEDER_STATS[self.channel]
+        stats['mode'] = self.feeder_mode
+        parked = False
+        if self.feeder_mode != 'poll':
+            next_tick_time = time.time()
         
         while 1:
-            current_time = time.time()
-            if current_time < next_tick_time:
-                await asyncio.sleep(tick_time_window)
-                continue
-            next_tick_time = current_time + self.bg_wave_update_time_window
+            if self.feeder_mode == 'poll':
+                current_time = time.time()
+                stats['wakeups'] += 1
+                if current_time < next_tick_time:
+                    await asyncio.sleep(tick_time_window)
+                    continue
+                next_tick_time = current_time + self.bg_wave_update_time_window
+            else:
+                if parked:
+                    # Idle channel: sleep until osc_value_handler writes a sample
+                    self.sample_event.clear()
+                    await self.sample_event.wait()
+                    parked = False
+                    next_tick_time = time.time()
+                else:
+                    delay = next_tick_time - time.time()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                stats['wakeups'] += 1
+                current_time = time.time()
+                drift_ms = max(0.0, current_time - next_tick_time) * 1000
+                stats['drift_last_ms'] = drift_ms
+                stats['drift_sum_ms'] += drift_ms
+                if drift_ms > stats['drift_max_ms']:
+                    stats['drift_max_ms'] = drift_ms
+                # Fixed-rate deadlines, resync if we fell more than a frame behind
+                next_tick_time += self.bg_wave_update_time_window
+                if next_tick_time <= current_time:
+                    stats['overruns'] += 1
+                    next_tick_time = current_time + self.bg_wave_update_time_window
+            stats['ticks'] += 1
+            lap = PROFILER.lap('feeder_tick') if PROFILER.enabled else None
+            samples = self.consume_samples()
+            if lap:
+                lap('ingest')
             
             # Calculate time delta for proper decay
             time_delta = current_time - last_time
@@ -245,6 +314,8 @@ class ShockHandler(BaseHandler):
                 _, _, acceleration, _ = self.compute_derivative()
                 # Normalize acceleration using configurable range
                 raw_strength = min(1.0, abs(acceleration) / max(0.1, accel_range))
+            if lap:
+                lap('pattern')
             
             # ── Random Boost Logic ──
             # 1) If boost_max was set to 0 (disabled) → instantly reset boost
@@ -292,6 +363,8 @@ class ShockHandler(BaseHandler):
                     zero_time = 0.0
             
             last_raw_strength = raw_strength
+            if lap:
+                lap('boost')
             
             # Apply sensitivity multiplier
             scaled_strength = raw_strength * sensitivity
@@ -326,6 +399,8 @@ class ShockHandler(BaseHandler):
                     f'Channel {self.channel}: ⚡ Random boost +{int(current_boost)} '
                     f'exceeds limit {device_limit}! Power: {device_power}/{effective_limit}'
                 )
+            if lap:
+                lap('limits')
             
             # Update visualizer data for GUI
             POWER_VISUALIZER_DATA[self.channel] = {
@@ -341,8 +416,18 @@ class ShockHandler(BaseHandler):
                 'pattern': pattern,
                 'warning': is_exceeding,
             }
+            if lap:
+                lap('visualizer')
             
             if current_strength == last_strength == 0:
+                # Nothing will change until a new sample arrives
+                if (self.feeder_mode != 'poll' and raw_strength == 0
+                        and current_boost == 0 and self.bg_wave_base_strength == 0
+                        and (self.resampler is None or not self.resampler.pending())):
+                    parked = True
+                    stats['parks'] += 1
+                if lap:
+                    lap.done()
                 continue
             
             # Send wave pattern (controls the wave shape)
@@ -351,6 +436,8 @@ class ShockHandler(BaseHandler):
                 last_strength, 
                 current_strength
             )
+            if lap:
+                lap('encode')
             
             # IMPORTANT: Also update actual device power dynamically!
             # This makes the device actually change power based on input
@@ -365,7 +452,18 @@ class ShockHandler(BaseHandler):
                 last_device_power = device_power
             
             last_strength = current_strength
-            await self.DG_CONN.broadcast_wave(self.channel, wavestr=wave)
+            # Receive times of the samples behind this frame, timed again when it is written
+            trace = None
+            if samples:
+                created = time.time()
+                ingest = LATENCY[self.channel]['ingest']
+                for t, _ in samples:
+                    ingest.add(created - t)
+                trace = (self.channel, created, [t for t, _ in samples])
+            await self.DG_CONN.broadcast_wave(self.channel, wavestr=wave, trace=trace)
+            if lap:
+                lap('send')
+                lap.done()
 
     async def distance_background_wave_feeder(self):
         tick_time_window = self.bg_wave_update_time_window / 20
@@ -399,19 +497,25 @@ class ShockHandler(BaseHandler):
         current_time = time.time()
         if distance > self.mode_config['trigger_range']['bottom'] and current_time > self.to_clear_time:
             shock_duration = self.mode_config['shock']['duration']
-            await self.set_clear_after(shock_duration)
+            self.clear_after(shock_duration)
             pass
             asyncio.create_task(self.send_shock_wave(shock_duration, self.mode_config['shock']['wave']))
 
     async def handler_touch(self, distance):
-        await self.set_clear_after(0.5)
+        self.clear_after(0.5)
         out_distance = self.normalize_distance(distance)
         if out_distance == 0:
             return
         t = time.time()
         self.touch_dist_arr.append([t,out_distance])
+        self.derivative.append(t, out_distance)
     
     def compute_derivative(self):
+        if self.derivative_method == 'streaming':
+            return self.derivative.values()
+        return self.compute_derivative_numpy()
+
+    def compute_derivative_numpy(self):
         data = self.touch_dist_arr
         if len(data) < 4:
             # logger.warning('At least 4 samples are required to calculate acc and jerk.')
@@ -0,0 +1,23 @@
+from functools import lru_cache
+
+# Two-digit uppercase hex for every byte value, as used in Coyote v3 wave frames
+HEX_TABLE = tuple("{:02X}".format(i) for i in range(256))
+
+
+def hex_byte(value):
+    if 0 <= value < 256:
+        return HEX_TABLE[value]
+    return "{:02X}".format(value)
+
+
+@lru_cache(maxsize=8192)
+def encode_wave_frame(freq, from_, to_):
+    """Serialized one-frame pulse payload, eg. '["0A0A0A0A14283C50"]'.
+
+    from_ and to_ are integer percentages (0-100). The whole domain is
+    ~1M keys, so only the recently used frames are kept.
+    """
+    freq_hex = hex_byte(freq)
+    delta = (to_ - from_) // 4
+    strengths = ''.join(HEX_TABLE[min(max(from_ + delta*i, 0), 100)] for i in range(1, 5, 1))
+    return '["' + freq_hex*4 + strengths + '"]'
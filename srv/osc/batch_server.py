@@ -0,0 +1,173 @@
+import collections, select, socket, struct, sys, threading, time
+from loguru import logger
+from pythonosc.osc_server import AsyncIOOSCUDPServer
+
+from .fast_server import OSCFastProtocol, FALLBACK
+from .router import OSCRouter
+
+# struct timespec carried by SCM_TIMESTAMPNS, Linux only. The socket module
+# does not export the constant, 35 is its value in the generic Linux ABI.
+SO_TIMESTAMPNS = getattr(socket, 'SO_TIMESTAMPNS', 35 if sys.platform.startswith('linux') else None)
+TIMESPEC = struct.Struct('@ll')
+
+
+class OSCBatchReceiver(OSCFastProtocol):
+    """Receives OSC datagrams on a dedicated thread and hands them to the loop in batches.
+
+    The thread waits for the socket to become readable, then drains it with
+    non-blocking reads (up to batch_size datagrams per wakeup) and decodes each
+    one with OSCFastProtocol.decode. Decoded samples go into a bounded deque,
+    whose append/popleft are atomic, and a single drain callback is scheduled
+    on the loop while the ring holds undrained samples. Loop callbacks therefore
+    scale with wakeups, not with packets.
+
+    Samples carry the kernel receive timestamp (SO_TIMESTAMPNS) where the
+    platform supports it, otherwise the wall clock read right after recvfrom.
+    """
+    RECV_SIZE = 65535
+    RCVBUF_SIZE = 1 << 20
+    ANCBUF_SIZE = socket.CMSG_SPACE(TIMESPEC.size) if hasattr(socket, 'CMSG_SPACE') else 0
+
+    def __init__(self, dispatcher: OSCRouter, loop, batch_size=64, ring_size=8192, relay=None, recorder=None) -> None:
+        super().__init__(dispatcher, relay, recorder)
+        self.loop = loop
+        self.batch_size = batch_size
+        self.ring = collections.deque(maxlen=ring_size)
+        self.drain_scheduled = False
+        self.closing = False
+        self.sock = None
+        self.thread = None
+        self.timestamping = 'read'
+        self.stats.update({
+            'batches': 0,     # Thread wakeups that read at least one datagram
+            'max_batch': 0,
+            'drains': 0,      # Loop callbacks
+            'overflow': 0,    # Samples lost to a full ring
+        })
+
+    def start(self, server_address):
+        host, port = server_address
+        family, type_, proto, _, sockaddr = socket.getaddrinfo(host, port, type=socket.SOCK_DGRAM)[0]
+        sock = socket.socket(family, type_, proto)
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.RCVBUF_SIZE)
+        except OSError:
+            pass
+        if SO_TIMESTAMPNS is not None:
+            try:
+                sock.setsockopt(socket.SOL_SOCKET, SO_TIMESTAMPNS, 1)
+                self.timestamping = 'kernel'
+            except OSError:
+                pass
+        sock.bind(sockaddr)
+        sock.setblocking(False)
+        logger.info(f'OSC batch receiver on {sockaddr}, {self.timestamping} timestamps')
+        self.sock = sock
+        # Replies from fallback handlers are sent on the same socket
+        self.connection_made(self)
+        self.thread = threading.Thread(target=self.receive_loop, name='osc-batch-receiver', daemon=True)
+        self.thread.start()
+
+    def sendto(self, data, address):
+        self.sock.sendto(data, address)
+
+    def close(self):
+        self.closing = True
+        if self.sock is not None:
+            self.sock.close()
+        self.close_outputs()
+
+    def recv(self):
+        """(data, client_address, receive time) of one datagram, raises BlockingIOError when drained."""
+        if self.timestamping != 'kernel':
+            data, client_address = self.sock.recvfrom(self.RECV_SIZE)
+            return data, client_address, time.time()
+        data, ancdata, _, client_address = self.sock.recvmsg(self.RECV_SIZE, self.ANCBUF_SIZE)
+        for level, type_, cdata in ancdata:
+            if level == socket.SOL_SOCKET and type_ == SO_TIMESTAMPNS and len(cdata) >= TIMESPEC.size:
+                sec, nsec = TIMESPEC.unpack_from(cdata)
+                return data, client_address, sec + nsec * 1e-9
+        return data, client_address, time.time()
+
+    def receive_loop(self):
+        sock = self.sock
+        ring = self.ring
+        stats = self.stats
+        relay = self.relay
+        recorder = self.recorder
+        while not self.closing:
+            try:
+                readable, _, _ = select.select([sock], [], [], 0.5)
+            except (OSError, ValueError):
+                break
+            if not readable:
+                continue
+            count = 0
+            while count < self.batch_size:
+                try:
+                    data, client_address, t = self.recv()
+                except BlockingIOError:
+                    break
+                except OSError:
+                    if self.closing:
+                        return
+                    logger.exception('OSC batch receive failed')
+                    break
+                count += 1
+                stats['received'] += 1
+                if relay is not None:
+                    relay.forward(data, t)
+                if recorder is not None:
+                    recorder.record(data)
+                sample = self.decode(data)
+                if sample is FALLBACK:
+                    sample = (FALLBACK, data, client_address)
+                elif not sample:
+                    stats['dropped'] += 1
+                    continue
+                else:
+                    sample += (t,)
+                if len(ring) == ring.maxlen:
+                    stats['overflow'] += 1
+                ring.append(sample)
+            if count:
+                stats['batches'] += 1
+                stats['max_batch'] = max(stats['max_batch'], count)
+            if ring and not self.drain_scheduled:
+                self.drain_scheduled = True
+                try:
+                    self.loop.call_soon_threadsafe(self.drain)
+                except RuntimeError:
+                    return  # Loop closed
+
+    def drain(self):
+        # Cleared before popping, anything appended after this is either popped
+        # below or schedules another drain.
+        self.drain_scheduled = False
+        self.stats['drains'] += 1
+        ring = self.ring
+        while ring:
+            sample = ring.popleft()
+            if sample[0] is FALLBACK:
+                self.fallback(sample[1], sample[2])
+            else:
+                self.dispatch(*sample)
+
+
+class OSCBatchUDPServer(AsyncIOOSCUDPServer):
+    """AsyncIOOSCUDPServer receiving on a thread with OSCBatchReceiver, requires an OSCRouter dispatcher.
+
+    create_serve_endpoint returns the receiver as both transport and protocol,
+    transport.close() stops the receive thread.
+    """
+
+    def __init__(self, server_address, dispatcher, loop, relay=None, recorder=None) -> None:
+        super().__init__(server_address, dispatcher, loop)
+        self.relay = relay
+        self.recorder = recorder
+        self.protocol = None
+
+    async def create_serve_endpoint(self):
+        self.protocol = OSCBatchReceiver(self.dispatcher, self._loop, relay=self.relay, recorder=self.recorder)
+        self.protocol.start(self._server_address)
+        return self.protocol, self.protocol
@@ -0,0 +1,166 @@
+import asyncio, struct, time
+from loguru import logger
+from pythonosc.osc_server import AsyncIOOSCUDPServer
+from pythonosc.osc_message_builder import build_msg
+
+from .router import OSCRouter, OSC_PATTERN_CHARS
+from ..runtime.profiler import profiled
+
+FLOAT = struct.Struct('>f')
+INT = struct.Struct('>i')
+
+TAG_FLOAT = b',f\x00\x00'
+TAG_INT   = b',i\x00\x00'
+TAG_TRUE  = b',T\x00\x00'
+TAG_FALSE = b',F\x00\x00'
+
+# Route entry for addresses that must go through pythonosc
+FALLBACK = None
+
+
+class OSCFastProtocol(asyncio.DatagramProtocol):
+    """Filters datagrams on their raw address before any pythonosc parsing.
+
+    Unknown addresses are dropped after one dict lookup on the address bytes.
+    Single float/int/bool messages for mapped addresses are decoded with struct
+    into the value BaseHandler.param_sanitizer would produce and passed to the
+    handlers' osc_value_handler. Bundles, patterns and anything else go through
+    the regular pythonosc dispatcher.
+    """
+    CACHE_SIZE = 4096
+
+    def __init__(self, dispatcher: OSCRouter, relay=None, recorder=None) -> None:
+        self.dispatcher = dispatcher
+        self.relay = relay
+        self.recorder = recorder
+        self.transport = None
+        self.routes = {}
+        self.routes_index = None
+        self.stats = {
+            'received': 0,
+            'fast': 0,        # Decoded by the struct fast path
+            'fallback': 0,    # Handed to pythonosc
+            'dropped': 0,     # No handler for the address
+        }
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def connection_lost(self, exc):
+        self.close_outputs()
+
+    def close_outputs(self):
+        """Close the relay socket and the recorder file once receiving stopped, safe to call twice."""
+        if self.relay is not None:
+            self.relay.close()
+        if self.recorder is not None:
+            self.recorder.close()
+
+    def resolve(self, raw_address: bytes):
+        """Route entry for an address: (address, value handlers), () to drop, or FALLBACK."""
+        try:
+            address = raw_address.decode('ascii')
+        except UnicodeDecodeError:
+            return FALLBACK
+        if OSC_PATTERN_CHARS.intersection(address):
+            return FALLBACK
+        handlers = self.dispatcher.route(address)
+        if not handlers:
+            return ()
+        value_handlers = []
+        for handler in handlers:
+            value_handler = getattr(getattr(handler.callback, '__self__', None), 'osc_value_handler', None)
+            if value_handler is None or handler.args or handler.needs_reply_address:
+                return FALLBACK
+            value_handlers.append(value_handler)
+        return (address, tuple(value_handlers))
+
+    def fallback(self, data, client_address):
+        self.stats['fallback'] += 1
+        for r in self.dispatcher.call_handlers_for_packet(data, client_address):
+            if isinstance(r, str):
+                r = [r]
+            elif not isinstance(r, tuple):
+                continue
+            self.transport.sendto(build_msg(r[0], r[1:]).dgram, client_address)
+
+    @profiled('osc_decode')
+    def decode(self, data):
+        """(address, value handlers, value) for a fast path message, () to drop, or FALLBACK."""
+        end = data.find(b'\x00')
+        if end <= 0 or data[0] != 0x2f:  # Bundles start with '#bundle'
+            return FALLBACK
+
+        # The router swaps its index on map() and on avatar profile changes
+        index = self.dispatcher.index
+        if index is not self.routes_index:
+            self.routes.clear()
+            self.routes_index = index
+        raw_address = data[:end]
+        route = self.routes.get(raw_address, 0)
+        if route == 0:
+            route = self.resolve(raw_address)
+            if len(self.routes) >= self.CACHE_SIZE:
+                self.routes.clear()
+            self.routes[raw_address] = route
+        if not route:
+            return route
+
+        # Address is padded to a multiple of 4 bytes, then the type tag string
+        tag_at = (end + 4) & ~3
+        tag = data[tag_at:tag_at + 4]
+        try:
+            if tag == TAG_FLOAT:
+                val = min(max(FLOAT.unpack_from(data, tag_at + 4)[0], 0.0), 1.0)
+            elif tag == TAG_INT:
+                val = min(max(INT.unpack_from(data, tag_at + 4)[0], 0), 1)
+            elif tag == TAG_TRUE:
+                val = True
+            elif tag == TAG_FALSE:
+                val = False
+            else:
+                return FALLBACK
+        except struct.error:
+            return FALLBACK
+        return (route[0], route[1], val)
+
+    def dispatch(self, address, value_handlers, val, t):
+        self.stats['fast'] += 1
+        for value_handler in value_handlers:
+            try:
+                value_handler(address, val, t)
+            except Exception:
+                logger.exception(f'OSC handler failed for {address}')
+
+    def datagram_received(self, data, client_address):
+        # Stamped at socket read, before any task scheduling delay
+        t = time.time()
+        self.stats['received'] += 1
+        if self.relay is not None:
+            self.relay.forward(data, t)
+        if self.recorder is not None:
+            self.recorder.record(data)
+        sample = self.decode(data)
+        if sample is FALLBACK:
+            return self.fallback(data, client_address)
+        if not sample:
+            self.stats['dropped'] += 1
+            return
+        self.dispatch(*sample, t)
+
+
+class OSCFastUDPServer(AsyncIOOSCUDPServer):
+    """AsyncIOOSCUDPServer using OSCFastProtocol, requires an OSCRouter dispatcher."""
+
+    def __init__(self, server_address, dispatcher, loop, relay=None, recorder=None) -> None:
+        super().__init__(server_address, dispatcher, loop)
+        self.relay = relay
+        self.recorder = recorder
+        self.protocol = None
+
+    def create_serve_endpoint(self):
+        self.protocol = OSCFastProtocol(self.dispatcher, self.relay, self.recorder)
+        return self._loop.create_datagram_endpoint(
+            lambda: self.protocol,
+            local_addr=self._server_address,
+        )
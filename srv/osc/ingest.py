@@ -0,0 +1,40 @@
+class SampleSlots():
+    """Per-address latest-value slots written synchronously by the OSC receive path.
+
+    Each slot holds [seq, timestamp, value]. Repeats of the current value are
+    dropped, feeders read whatever changed since their last tick with consume().
+    """
+    def __init__(self) -> None:
+        self.slots = {}
+        self.seq = 0
+        self.consumed_seq = 0
+        self.stats = {
+            'received': 0,
+            'deduplicated': 0,
+            'consumed': 0,
+        }
+
+    def write(self, address, val, t):
+        """Store a sample, False if it repeats the slot's current value."""
+        self.stats['received'] += 1
+        slot = self.slots.get(address)
+        if slot is not None and slot[2] == val:
+            self.stats['deduplicated'] += 1
+            return False
+        self.seq += 1
+        if slot is None:
+            self.slots[address] = [self.seq, t, val]
+        else:
+            slot[0] = self.seq
+            slot[1] = t
+            slot[2] = val
+        return True
+
+    def consume(self):
+        """[(timestamp, value)] of slots updated since the last call, oldest first."""
+        if self.seq == self.consumed_seq:
+            return []
+        fresh = sorted(slot for slot in self.slots.values() if slot[0] > self.consumed_seq)
+        self.consumed_seq = self.seq
+        self.stats['consumed'] += len(fresh)
+        return [(t, val) for _, t, val in fresh]
@@ -0,0 +1,166 @@
+import time
+from loguru import logger
+
+from ..handler.base_handler import BaseHandler
+from ..runtime.profiler import profiled
+
+MIX_MODES = ('max', 'sum', 'mean')
+
+
+class MixerInput():
+    """One configured avatar parameter (address or pattern), mapped once on the dispatcher.
+
+    Keeps the latest value per concrete address as [seq, t, val] and wakes the
+    handlers whose rows read it. Parameters shared between channels are
+    written once. `tables` holds the reading handlers per routing profile
+    (None for the default table), `handlers` is the active profile's list.
+    """
+    def __init__(self, mixer, param) -> None:
+        self.mixer = mixer
+        self.param = param
+        self.slots = {}
+        self.tables = {}
+
+    @property
+    def handlers(self):
+        return self.tables.get(self.mixer.active_profile, ())
+
+    def osc_handler(self, address, *args):
+        self.osc_value_handler(address, BaseHandler.param_sanitizer(args))
+
+    @profiled('osc_value_handler')
+    def osc_value_handler(self, address, val, t=None):
+        mixer = self.mixer
+        mixer.stats['received'] += 1
+        for handler in self.handlers:
+            handler.clear_after(handler.sample_timeout)
+        slot = self.slots.get(address)
+        if slot is not None and slot[0] > mixer.reset_seq and slot[2] == val:
+            mixer.stats['deduplicated'] += 1
+            return
+        mixer.seq += 1
+        self.slots[address] = [mixer.seq, time.time() if t is None else t, val]
+        for handler in self.handlers:
+            handler.on_sample()
+
+
+class MixerRow():
+    """Sparse row of the mixing matrix for one channel, read like SampleSlots.consume().
+
+    consume() evaluates the row once per tick: every (input, weight) entry
+    contributes weight * value for each address the input has seen, combined
+    by max, sum (clipped to 1) or weighted mean. It returns the mixed value
+    stamped with the newest contributing sample, or nothing if no input of
+    the row changed since the last call. Like MixerInput, entries are kept
+    per routing profile in `tables` and `entries` is the active profile's.
+    """
+    def __init__(self, mixer, channel, mode='max') -> None:
+        if mode not in MIX_MODES:
+            raise ValueError(f'Unknown mix mode {mode}, expected one of {MIX_MODES}.')
+        self.mixer = mixer
+        self.channel = channel
+        self.mode = mode
+        self.tables = {}
+        self.weights = {}
+        self.seen_seq = 0
+        self.stats = {
+            'mode': mode,
+            'inputs': 0,
+            'consumed': 0,
+        }
+
+    @property
+    def entries(self):
+        return self.tables.get(self.mixer.active_profile, ())
+
+    def consume(self):
+        seq = self.mixer.seq
+        if seq == self.seen_seq:
+            return []
+        seen_seq = self.seen_seq
+        self.seen_seq = seq
+        reset_seq = self.mixer.reset_seq
+        newest = None
+        total = 0.0
+        weight_sum = 0.0
+        use_max = self.mode == 'max'
+        entries = self.entries
+        self.stats['inputs'] = len(entries)
+        for inp, weight in entries:
+            for slot_seq, t, val in inp.slots.values():
+                if slot_seq <= reset_seq:
+                    continue
+                if slot_seq > seen_seq and (newest is None or t > newest):
+                    newest = t
+                contribution = weight * val
+                if use_max:
+                    if contribution > total:
+                        total = contribution
+                else:
+                    total += contribution
+                    weight_sum += weight
+        if newest is None:
+            return []
+        if self.mode == 'mean':
+            total = total / weight_sum if weight_sum else 0.0
+        self.stats['consumed'] += 1
+        return [(newest, min(total, 1.0))]
+
+
+class ParamMixer():
+    """Routes avatar parameters to channels through a sparse weight matrix.
+
+    Each distinct parameter becomes one MixerInput whose osc_handler is mapped
+    on the dispatcher, each channel handler reads its MixerRow as its ingest
+    stage. Every avatar profile gets its own matrix, inputs and rows look up
+    theirs through `active_profile`, so activate_profile() is a single
+    reference flip and a param routed to a channel by one profile never
+    drives it under another. Values older than `reset_seq` are ignored,
+    which makes reset() O(1) as well.
+    """
+    def __init__(self) -> None:
+        self.inputs = {}
+        self.rows = {}
+        self.active_profile = None
+        self.seq = 0
+        self.reset_seq = 0
+        self.stats = {
+            'received': 0,
+            'deduplicated': 0,
+        }
+
+    def attach(self, handler, mode='max', weights=None):
+        """Make a MixerRow the ingest stage of `handler`, params are added with route()."""
+        row = MixerRow(self, handler.channel, mode)
+        row.weights = weights or {}
+        if handler.resampler is not None:
+            logger.warning(f'Channel {handler.channel}: resample_hz is ignored when mix_mode is set.')
+            handler.resampler = None
+        self.rows[handler.channel] = row
+        handler.ingest = row
+        return row
+
+    def route(self, handler, param, profile=None):
+        """Dispatcher callback routing `param` into `handler`'s row in `profile`'s matrix, weight from param_weights (default 1)."""
+        row = self.rows[handler.channel]
+        inp = self.inputs.get(param)
+        if inp is None:
+            inp = self.inputs[param] = MixerInput(self, param)
+        handlers = inp.tables.setdefault(profile, [])
+        if handler not in handlers:
+            handlers.append(handler)
+            row.tables.setdefault(profile, []).append((inp, float(row.weights.get(param, 1.0))))
+        return inp.osc_handler
+
+    def activate_profile(self, profile=None):
+        """Switch every row and input to `profile`'s matrix, None for the default one."""
+        self.active_profile = profile
+
+    def reset(self, *args):
+        """Forget every input value, e.g. after an avatar change."""
+        self.reset_seq = self.seq
+
+    def avatar_change(self, profile):
+        """Router profile listener, `profile` is None for avatars without one."""
+        self.activate_profile(profile)
+        self.reset()
@@ -0,0 +1,50 @@
+from functools import partial
+from loguru import logger
+
+AVATAR_CHANGE_ADDRESS = '/avatar/change'
+
+
+def channel_router(handler, chann_settings, mixer):
+    """(param, profile) -> dispatcher callback for one shock channel, through the mixer unless mix_mode is 'last'."""
+    mix_mode = chann_settings.get('mix_mode', 'last')
+    if mix_mode == 'last':
+        return lambda param, profile=None: handler.osc_handler
+    mixer.attach(handler, mix_mode, chann_settings.get('param_weights'))
+    return partial(mixer.route, handler)
+
+
+def build_routing(dispatcher, channel_routers, default_params, shared=(), profiles=None, mixer=None):
+    """Map the default routing table and precompile one table per avatar profile.
+
+    channel_routers: config channel name -> channel_router() result.
+    default_params: config channel name -> avatar_params.
+    shared: (address, callback) pairs present in every table, e.g. Tuya params.
+    profiles: avatar id -> {config channel name: [params]}. Channels missing
+        from a profile keep their default params.
+    """
+    profiles = profiles or {}
+
+    def table(channel_params, profile=None):
+        mappings = []
+        for name, params in channel_params.items():
+            route = channel_routers[name]
+            mappings += [(param, route(param, profile)) for param in params]
+        mappings += shared
+        if profiles:
+            mappings.append((AVATAR_CHANGE_ADDRESS, dispatcher.avatar_change))
+        # A param shared by two mixed channels resolves to the same input callback
+        return list(dict.fromkeys(mappings))
+
+    for address, callback in table(default_params):
+        dispatcher.map(address, callback)
+    for avatar_id, profile in profiles.items():
+        unknown = set(profile) - set(channel_routers)
+        if unknown:
+            logger.warning(f'Avatar profile {avatar_id}: unknown channels {sorted(unknown)} ignored.')
+        channel_params = dict(default_params)
+        channel_params.update((name, params) for name, params in profile.items() if name in channel_routers)
+        dispatcher.add_profile(avatar_id, table(channel_params, avatar_id))
+        logger.success(f'Avatar profile {avatar_id}: {channel_params}')
+    if mixer is not None:
+        dispatcher.profile_listeners.append(mixer.avatar_change)
+    return dispatcher.compile()
@@ -0,0 +1,78 @@
+import atexit, os, struct, threading, time
+
+MAGIC = b'SVOSCREC\x01'
+# Per datagram: microseconds since the previous record, datagram length
+RECORD = struct.Struct('<IH')
+MAX_DELTA_US = 0xFFFFFFFF
+
+
+class OSCRecorder():
+    """Appends every received OSC datagram to a compact binary file.
+
+    The file starts with MAGIC, followed by RECORD headers each trailed by the
+    raw datagram. Deltas come from time.monotonic_ns(). Every recording session
+    starts with an empty record, so sessions appended to the same file replay
+    back to back without the real gap between them; empty datagrams are not
+    recorded. record() may run on the receive thread while close() runs on
+    the loop thread, both hold `lock`.
+    """
+    BUFFER_SIZE = 1 << 16
+
+    def __init__(self, path) -> None:
+        self.path = path
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        self.lock = threading.Lock()
+        self.file = open(path, 'ab', buffering=self.BUFFER_SIZE)
+        if new_file:
+            self.file.write(MAGIC)
+        self.file.write(RECORD.pack(0, 0))
+        self.last_ns = None
+        self.stats = {
+            'path': path,
+            'recorded': 0,
+            'bytes': 0,
+        }
+        atexit.register(self.close)
+
+    def record(self, data):
+        if not data:
+            return  # A zero length record marks a new session
+        with self.lock:
+            if self.file.closed:
+                return  # Server stopped while the receiver is still running
+            now = time.monotonic_ns()
+            delta_us = 0 if self.last_ns is None else min((now - self.last_ns) // 1000, MAX_DELTA_US)
+            self.last_ns = now
+            self.file.write(RECORD.pack(delta_us, len(data)))
+            self.file.write(data)
+        self.stats['recorded'] += 1
+        self.stats['bytes'] += RECORD.size + len(data)
+
+    def close(self):
+        """Flush and close the file, called when the OSC server stops or at exit."""
+        with self.lock:
+            if not self.file.closed:
+                self.file.close()
+        atexit.unregister(self.close)
+
+
+def read_recording(path):
+    """Yield (seconds since the start of the session, datagram), None marks a new session."""
+    with open(path, 'rb') as fr:
+        if fr.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f'{path} is not an OSC recording.')
+        offset_us = 0
+        while 1:
+            header = fr.read(RECORD.size)
+            if len(header) < RECORD.size:
+                return
+            delta_us, size = RECORD.unpack(header)
+            if size == 0:
+                offset_us = 0
+                yield None
+                continue
+            data = fr.read(size)
+            if len(data) < size:
+                return  # Truncated by a crash while recording
+            offset_us += delta_us
+            yield offset_us / 1e6, data
@@ -0,0 +1,59 @@
+import socket, time
+from loguru import logger
+
+
+def parse_target(target, default_host='127.0.0.1'):
+    """9002 or 'host:port' -> (host, port)."""
+    if isinstance(target, int):
+        return (default_host, target)
+    host, _, port = str(target).rpartition(':')
+    return (host or default_host, int(port))
+
+
+class OSCRelay():
+    """Forwards received OSC datagrams unchanged to other local OSC apps.
+
+    The receive path calls forward() with the datagram bytes it just read,
+    before any decoding, and the same object is handed to sendto() for every
+    target. With `prefixes`, only datagrams whose raw address starts with one
+    of them are forwarded (bundles start with '#bundle').
+    """
+    def __init__(self, targets, prefixes=()) -> None:
+        self.targets = [parse_target(target) for target in targets]
+        self.prefixes = tuple(prefix.encode('ascii') for prefix in prefixes)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setblocking(False)
+        self.stats = {
+            'targets': [f'{host}:{port}' for host, port in self.targets],
+            'forwarded': 0,
+            'filtered': 0,
+            'bytes': 0,
+            'errors': 0,
+            'latency_last_us': 0.0,  # Receive timestamp to last sendto returning
+            'latency_max_us': 0.0,
+            'latency_sum_us': 0.0,
+        }
+        logger.success(f'OSC relay to {self.stats["targets"]}' + (f', prefixes {list(prefixes)}' if prefixes else ''))
+
+    def forward(self, data, t):
+        stats = self.stats
+        if self.prefixes and not data.startswith(self.prefixes):
+            stats['filtered'] += 1
+            return
+        sendto = self.sock.sendto
+        for target in self.targets:
+            try:
+                sendto(data, target)
+            except OSError:
+                # Nobody listening or buffer full, a relay must never stall the receiver
+                stats['errors'] += 1
+        latency_us = (time.time() - t) * 1e6
+        stats['forwarded'] += 1
+        stats['bytes'] += len(data)
+        stats['latency_last_us'] = latency_us
+        stats['latency_sum_us'] += latency_us
+        if latency_us > stats['latency_max_us']:
+            stats['latency_max_us'] = latency_us
+
+    def close(self):
+        self.sock.close()
@@ -0,0 +1,107 @@
+import collections, math
+
+
+class Resampler():
+    """Resamples irregular OSC parameter streams onto a fixed-rate grid.
+
+    Raw (t, value) samples are buffered per address. A grid point g is emitted
+    once a raw sample at or after g has arrived and `delay` seconds have
+    passed since g. Each address is linearly interpolated at g, or holds its
+    last value if it has no newer sample, and the addresses are combined with
+    max(). `delay` is the jitter buffer, it is the minimum latency the stage
+    adds. When the input goes quiet for `delay`, the newest sample itself is
+    emitted so a final value (e.g. 0 on contact exit) is never lost between
+    grid points.
+
+    VRChat only sends a parameter when it changes, so two samples further
+    apart than `hold_gap` (default 2 * delay) mean the value stood still in
+    between: the older value is held up to the newer sample instead of being
+    ramped, which would invent a slope for IMPACT/RECOIL to differentiate.
+    A gap longer than `max_gap` over all addresses restarts the grid, so a
+    long silence is not backfilled.
+    """
+    def __init__(self, rate=100, delay=0.03, max_gap=0.5, hold_gap=None) -> None:
+        self.rate = rate
+        self.step = 1 / rate
+        self.delay = delay
+        self.max_gap = max_gap
+        self.hold_gap = 2 * delay if hold_gap is None else hold_gap
+        self.streams = {}
+        self.grid_index = None  # Index of the next grid point, t = grid_index * step
+        self.latest = None      # Newest raw sample time over all streams
+        self.emitted_until = None
+        self.stats = {
+            'rate': rate,
+            'delay_ms': delay * 1000,
+            'pushed': 0,
+            'emitted': 0,
+            'restarts': 0,
+            'latency_last_ms': 0.0,  # now - grid time at emission
+            'latency_max_ms': 0.0,
+        }
+
+    def reset(self):
+        self.streams.clear()
+        self.grid_index = None
+        self.latest = None
+        self.emitted_until = None
+
+    def push(self, address, t, val):
+        self.stats['pushed'] += 1
+        if self.latest is not None and t - self.latest > self.max_gap:
+            self.reset()
+            self.stats['restarts'] += 1
+        if self.grid_index is None:
+            self.grid_index = math.ceil(t * self.rate)
+        stream = self.streams.get(address)
+        if stream is None:
+            stream = self.streams[address] = collections.deque()
+        if stream and t <= stream[-1][0]:
+            stream[-1] = (stream[-1][0], float(val))
+        else:
+            stream.append((t, float(val)))
+        if self.latest is None or t > self.latest:
+            self.latest = t
+
+    def pending(self):
+        return self.latest is not None and (self.emitted_until is None or self.emitted_until < self.latest)
+
+    def pull(self, now):
+        """[(t, value)] for the grid points that are ready at `now`."""
+        out = []
+        if self.grid_index is None:
+            return out
+        horizon = min(self.latest, now - self.delay)
+        step = self.step
+        while self.grid_index * step <= horizon:
+            g = self.grid_index * step
+            self.grid_index += 1
+            value = None
+            for stream in self.streams.values():
+                # Keep the newest sample at or before g as the left bracket
+                while len(stream) > 1 and stream[1][0] <= g:
+                    stream.popleft()
+                t0, v0 = stream[0]
+                if t0 > g:
+                    continue
+                if len(stream) > 1:
+                    t1, v1 = stream[1]
+                    if t1 - t0 <= self.hold_gap:
+                        v0 += (v1 - v0) * (g - t0) / (t1 - t0)
+                if value is None or v0 > value:
+                    value = v0
+            if value is not None:
+                out.append((g, value))
+        if out:
+            self.emitted_until = out[-1][0]
+        if now - self.delay >= self.latest and (self.emitted_until is None or self.emitted_until < self.latest):
+            out.append((self.latest, max(stream[-1][1] for stream in self.streams.values())))
+            self.emitted_until = self.latest
+        if out:
+            stats = self.stats
+            stats['emitted'] += len(out)
+            latency_ms = (now - out[-1][0]) * 1000
+            stats['latency_last_ms'] = latency_ms
+            if latency_ms > stats['latency_max_ms']:
+                stats['latency_max_ms'] = latency_ms
+        return out
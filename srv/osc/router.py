@@ -0,0 +1,136 @@
+import re
+from loguru import logger
+from pythonosc.dispatcher import Dispatcher
+
+# Characters that make an incoming address an OSC address pattern
+OSC_PATTERN_CHARS = set('*?[]{}')
+
+
+class OSCRouter(Dispatcher):
+    """Dispatcher with a routing index compiled once from the mapped avatar_params.
+
+    - exact addresses: one dict lookup
+    - addresses ending in a single '*': prefix trie
+    - any other wildcard: compiled regex, same semantics as Dispatcher
+    Results, including "no handler" for the flood of unrelated avatar parameters,
+    are cached per address so routing cost stays flat as params are added.
+
+    Per-avatar profiles are compiled into their own index up front. A
+    /avatar/change message (mapped to avatar_change) selects one by assigning
+    self.index, the routers' only routing state, so switching never rebuilds
+    anything. Unknown avatars use the index compiled from the regular mappings.
+    """
+    CACHE_SIZE = 4096
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.index = None
+        self.default_index = None
+        self.profiles = {}
+        self.active_profile = None
+        self.profile_listeners = []
+        self.stats = {
+            'routed': 0,       # Messages with at least one handler
+            'unmatched': 0,    # Messages nobody listens to
+            'cache_misses': 0,
+            'profile_switches': 0,
+        }
+
+    def map(self, address, handler, *args, needs_reply_address=False):
+        self.index = None
+        return super().map(address, handler, *args, needs_reply_address=needs_reply_address)
+
+    def unmap(self, address, handler, *args, needs_reply_address=False):
+        self.index = None
+        return super().unmap(address, handler, *args, needs_reply_address=needs_reply_address)
+
+    def compile(self):
+        """Build the exact map, prefix trie and regex list from the current mappings."""
+        exact = {}
+        trie = {}
+        regexes = []
+        for order, addr in enumerate(self._map):
+            if '*' not in addr:
+                exact[addr] = order
+            elif addr.index('*') == len(addr) - 1:
+                node = trie
+                for c in addr[:-1]:
+                    node = node.setdefault(c, {})
+                node.setdefault(None, []).append(order)
+            else:
+                regexes.append((order, re.compile(addr.replace("*", ".*?") + "$")))
+        self.default_index = (exact, trie, regexes, list(self._map.values()), {}, self)
+        self.index = self.default_index
+        self.active_profile = None
+        return self.index
+
+    def add_profile(self, name, mappings):
+        """Precompile the routing table for one avatar from (address, callback) pairs."""
+        profile = OSCRouter()
+        profile._default_handler = self._default_handler
+        for address, callback in mappings:
+            profile.map(address, callback)
+        self.profiles[name] = profile.compile()
+
+    def activate_profile(self, name):
+        """Route with the profile compiled for `name`, or the default table if there is none."""
+        previous = self.active_profile  # compile() resets it
+        index = self.profiles.get(name)
+        if index is None:
+            name = None
+            index = self.default_index or self.compile()
+        self.index = index
+        if name != previous:
+            self.active_profile = name
+            self.stats['profile_switches'] += 1
+            for listener in self.profile_listeners:
+                listener(name)
+        return name
+
+    def avatar_change(self, address, avatar_id=None, *args):
+        """Handler for VRChat's /avatar/change, whose argument is the new avatar id."""
+        name = self.activate_profile(avatar_id)
+        logger.info(f'Avatar changed to {avatar_id}, routing profile: {name or "default"}')
+
+    def route(self, address):
+        """Tuple of handlers for a plain (non-pattern) address."""
+        exact, trie, regexes, handler_lists, cache, _ = self.index or self.compile()
+        handlers = cache.get(address)
+        if handlers is not None:
+            return handlers
+        self.stats['cache_misses'] += 1
+        matched = []
+        if address in exact:
+            matched.append(exact[address])
+        node = trie
+        for c in address:
+            if None in node:
+                matched.extend(node[None])
+            node = node.get(c)
+            if node is None:
+                break
+        else:
+            if None in node:
+                matched.extend(node[None])
+        for order, regex in regexes:
+            if regex.match(address):
+                matched.append(order)
+        handlers = tuple(handler for order in sorted(matched) for handler in handler_lists[order])
+        if len(cache) >= self.CACHE_SIZE:
+            cache.clear()
+        cache[address] = handlers
+        return handlers
+
+    def handlers_for_address(self, address_pattern):
+        if OSC_PATTERN_CHARS.intersection(address_pattern):
+            # Incoming OSC address pattern, rare, use the generic matcher on the active table
+            owner = (self.index or self.compile())[5]
+            return list(Dispatcher.handlers_for_address(owner, address_pattern))
+        handlers = self.route(address_pattern)
+        if handlers:
+            self.stats['routed'] += 1
+            return handlers
+        self.stats['unmatched'] += 1
+        if self._default_handler:
+            return (self._default_handler,)
+        return handlers
@@ -0,0 +1,26 @@
+from loguru import logger
+from pythonosc.osc_server import AsyncIOOSCUDPServer
+
+from .fast_server import OSCFastUDPServer
+from .batch_server import OSCBatchUDPServer
+from .relay import OSCRelay
+from .recorder import OSCRecorder
+
+
+def create_osc_server(osc_settings, dispatcher, loop):
+    """OSC server selected by the osc settings: batch_receive, fast_path, relay_ports and record_path."""
+    relay = None
+    if osc_settings.get('relay_ports'):
+        relay = OSCRelay(osc_settings['relay_ports'], osc_settings.get('relay_prefixes') or ())
+    recorder = None
+    if osc_settings.get('record_path'):
+        recorder = OSCRecorder(osc_settings['record_path'])
+        logger.success(f'Recording OSC traffic to {recorder.path}')
+    server_address = (osc_settings['listen_host'], osc_settings['listen_port'])
+    if osc_settings.get('batch_receive', False):
+        return OSCBatchUDPServer(server_address, dispatcher, loop, relay=relay, recorder=recorder)
+    if osc_settings.get('fast_path', True) or relay is not None or recorder is not None:
+        if not osc_settings.get('fast_path', True):
+            logger.warning('OSC relay and recorder need the fast path receiver, fast_path ignored.')
+        return OSCFastUDPServer(server_address, dispatcher, loop, relay=relay, recorder=recorder)
+    return AsyncIOOSCUDPServer(server_address, dispatcher, loop)
@@ -0,0 +1,81 @@
+import math
+
+
+class LatencySketch():
+    """Streaming latency histogram in constant memory.
+
+    Values (seconds) are counted in logarithmic buckets, so every quantile is
+    within `accuracy` relative error of the true value (DDSketch style).
+    Values outside [min_value, max_value] land in the first / last bucket.
+    """
+    __slots__ = ('min_value', 'gamma', 'log_gamma', 'offset', 'buckets', 'count', 'sum', 'max')
+
+    def __init__(self, accuracy=0.02, min_value=1e-5, max_value=100.0) -> None:
+        gamma = (1 + accuracy) / (1 - accuracy)
+        self.min_value = min_value
+        self.gamma = gamma
+        self.log_gamma = math.log(gamma)
+        self.offset = math.floor(math.log(min_value) / self.log_gamma)
+        self.buckets = [0] * (math.ceil(math.log(max_value) / self.log_gamma) - self.offset + 1)
+        self.reset()
+
+    def reset(self):
+        for i in range(len(self.buckets)):
+            self.buckets[i] = 0
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        if value <= self.min_value:
+            index = 0
+        else:
+            index = min(math.ceil(math.log(value) / self.log_gamma) - self.offset, len(self.buckets) - 1)
+        self.buckets[index] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q):
+        if not self.count:
+            return 0.0
+        rank = q * (self.count - 1)
+        seen = 0
+        for index, n in enumerate(self.buckets):
+            seen += n
+            if seen > rank:
+                # Bucket i holds (gamma^(i-1), gamma^i], this estimate is within accuracy of both ends
+                return min(2 * self.gamma ** (index + self.offset) / (self.gamma + 1), self.max)
+        return self.max
+
+    def summary(self, scale=1000):
+        """{'n', 'mean', 'p50', 'p95', 'p99', 'max'}, in milliseconds by default."""
+        return {
+            'n': self.count,
+            'mean': round(self.sum / self.count * scale, 3) if self.count else 0.0,
+            'p50': round(self.quantile(0.50) * scale, 3),
+            'p95': round(self.quantile(0.95) * scale, 3),
+            'p99': round(self.quantile(0.99) * scale, 3),
+            'max': round(self.max * scale, 3),
+        }
+
+
+# Per channel:
+# - ingest:   OSC datagram read -> consumed by the ShockHandler tick that builds a frame
+# - outbound: frame queued -> written to the WebSocket, per connection
+# - total:    OSC datagram read -> written to the WebSocket, per connection
+LATENCY = {
+    channel: {stage: LatencySketch() for stage in ('ingest', 'outbound', 'total')}
+    for channel in ['A', 'B']
+}
+
+
+def latency_summary():
+    return {channel: {stage: sketch.summary() for stage, sketch in stages.items()} for channel, stages in LATENCY.items()}
+
+
+def latency_reset():
+    for stages in LATENCY.values():
+        for sketch in stages.values():
+            sketch.reset()
@@ -0,0 +1,170 @@
+import asyncio, collections, os, sys, threading, time, traceback
+from loguru import logger
+
+from .latency import LatencySketch
+
+ASYNCIO_DIR = os.path.dirname(asyncio.__file__)
+
+
+def coro_name(task):
+    coro = task.get_coro()
+    return getattr(coro, '__qualname__', None) or type(coro).__name__
+
+
+class LoopMonitor():
+    """Event loop health: lag, live tasks and slow callback attribution.
+
+    A probe task sleeps `interval` seconds at a time; how much later than that
+    it wakes up is time the loop spent running other callbacks. The probe also
+    refreshes a heartbeat, and a watchdog thread that sees the heartbeat go
+    stale for `slow_threshold` samples the loop thread's stack and current task
+    while the slow callback is still running. Slow events are kept in a rolling
+    log of the last `log_size`.
+    """
+    STACK_DEPTH = 8
+
+    def __init__(self, interval=0.02, slow_threshold=0.05, task_interval=1.0, log_size=100) -> None:
+        self.interval = interval
+        self.slow_threshold = slow_threshold
+        self.task_interval = task_interval
+        self.loop = None
+        self.loop_thread = None
+        self.task = None
+        self.watchdog = None
+        self.beat = 0.0
+        self.stall = None     # Sample of the stall in progress, taken by the watchdog
+        self.lag = LatencySketch()
+        self.tasks = {}       # Coroutine name -> live tasks
+        self.slow_log = collections.deque(maxlen=log_size)
+        self.stats = {
+            'samples': 0,
+            'lag_last_ms': 0.0,
+            'lag_max_ms': 0.0,
+            'lag_sum_ms': 0.0,
+            'tasks': 0,
+            'slow_callbacks': 0,
+            'slow_ms': 0.0,    # Total lag spent in slow callbacks
+        }
+
+    def start(self):
+        """Start probing the running loop, a no-op if it is already probed."""
+        loop = asyncio.get_running_loop()
+        if self.loop is loop and self.task is not None and not self.task.done():
+            return
+        self.loop = loop
+        self.loop_thread = threading.get_ident()
+        self.beat = time.monotonic()
+        self.stall = None
+        self.task = loop.create_task(self._probe())
+        if self.watchdog is None:
+            self.watchdog = threading.Thread(target=self._watch, name='loop-watchdog', daemon=True)
+            self.watchdog.start()
+
+    def count_tasks(self):
+        counts = {}
+        for task in asyncio.all_tasks(self.loop):
+            name = coro_name(task)
+            counts[name] = counts.get(name, 0) + 1
+        self.tasks = dict(sorted(counts.items(), key=lambda kv: -kv[1]))
+        self.stats['tasks'] = sum(counts.values())
+
+    async def _probe(self):
+        loop = self.loop
+        stats = self.stats
+        interval = self.interval
+        next_count = 0.0
+        while 1:
+            start = loop.time()
+            self.beat = time.monotonic()
+            await asyncio.sleep(interval)
+            now = loop.time()
+            lag = max(0.0, now - start - interval)
+            self.lag.add(lag)
+            lag_ms = lag * 1000
+            stats['samples'] += 1
+            stats['lag_last_ms'] = lag_ms
+            stats['lag_sum_ms'] += lag_ms
+            if lag_ms > stats['lag_max_ms']:
+                stats['lag_max_ms'] = lag_ms
+            if lag >= self.slow_threshold:
+                self.record_slow(lag)
+            else:
+                self.stall = None  # Sampled near the threshold but finished under it
+            if now >= next_count:
+                next_count = now + self.task_interval
+                self.count_tasks()
+
+    def record_slow(self, lag):
+        stall, self.stall = self.stall, None
+        entry = {
+            'time': time.time(),
+            'lag_ms': round(lag * 1000, 3),
+            'task': stall['task'] if stall else None,
+            'stack': stall['stack'] if stall else None,
+        }
+        self.slow_log.append(entry)
+        self.stats['slow_callbacks'] += 1
+        self.stats['slow_ms'] += entry['lag_ms']
+        where = entry['task'] or (entry['stack'][-1] if entry['stack'] else 'unknown')
+        logger.warning(f"Event loop blocked for {entry['lag_ms']:.1f}ms by {where}")
+
+    def running_task(self, frame):
+        """Task whose coroutine frame is on the loop thread's stack, None for plain callbacks."""
+        try:
+            tasks = asyncio.all_tasks(self.loop)
+        except RuntimeError:
+            return None  # Task set kept changing under us
+        by_frame = {}
+        for task in tasks:
+            coro_frame = getattr(task.get_coro(), 'cr_frame', None)
+            if coro_frame is not None:
+                by_frame[id(coro_frame)] = task
+        # Only the running task's coroutine can be on the stack, below Task.__step
+        while frame is not None:
+            task = by_frame.get(id(frame))
+            if task is not None:
+                return task
+            frame = frame.f_back
+        return None
+
+    def sample_stall(self):
+        """Called from the watchdog thread while the loop is stuck."""
+        frame = sys._current_frames().get(self.loop_thread)
+        if frame is None:
+            return None
+        # Innermost frames outside asyncio itself, oldest first
+        stack = [
+            f'{fs.filename}:{fs.lineno} in {fs.name}' for fs in traceback.extract_stack(frame)
+            if not fs.filename.startswith(ASYNCIO_DIR)
+        ][-self.STACK_DEPTH:]
+        current = self.running_task(frame)
+        return {
+            'task': coro_name(current) if current is not None else None,
+            'stack': stack,
+        }
+
+    def _watch(self):
+        while 1:
+            time.sleep(self.slow_threshold / 2)
+            if self.loop is None or not self.loop.is_running():
+                continue
+            beat = self.beat
+            stalled = time.monotonic() - beat - self.interval
+            if stalled >= self.slow_threshold and self.stall is None:
+                stall = self.sample_stall()
+                # The loop may have moved on while sampling, the stack would belong to whatever runs next
+                if self.beat == beat:
+                    self.stall = stall
+
+    def snapshot(self):
+        return {
+            **self.stats,
+            'slow_threshold_ms': self.slow_threshold * 1000,
+            'lag': self.lag.summary(),
+            'tasks_by_coro': self.tasks,
+            'slow_log': list(self.slow_log),
+        }
+
+
+# Shared monitor of the server event loop
+LOOP_MONITOR = LoopMonitor()
@@ -0,0 +1,118 @@
+from srv import WS_CONNECTIONS
+from srv.handler.shock_handler import FEEDER_STATS
+from srv.connector.machine_tuya_cloud import TUYA_CONNECTIONS
+from .latency import LATENCY
+from .loop_monitor import LOOP_MONITOR
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+PREFIX = 'shocking_vrchat_'
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class MetricsWriter():
+    """Prometheus text exposition format, one HELP/TYPE block per metric family.
+
+    Everything is read from the plain counters the hot paths already keep, so
+    scraping costs nothing until /metrics is requested.
+    """
+    def __init__(self) -> None:
+        self.lines = []
+
+    def _sample(self, name, labels, value):
+        if labels:
+            label_str = ','.join(f'{k}="{escape(v)}"' for k, v in labels.items())
+            self.lines.append(f'{name}{{{label_str}}} {value}')
+        else:
+            self.lines.append(f'{name} {value}')
+
+    def metric(self, name, kind, help, samples):
+        """samples: [(labels, value)], kind: counter / gauge."""
+        name = PREFIX + name
+        self.lines.append(f'# HELP {name} {help}')
+        self.lines.append(f'# TYPE {name} {kind}')
+        for labels, value in samples:
+            self._sample(name, labels, value)
+
+    def summary(self, name, help, sketches):
+        """sketches: [(labels, LatencySketch)] recorded in seconds."""
+        name = PREFIX + name
+        self.lines.append(f'# HELP {name} {help}')
+        self.lines.append(f'# TYPE {name} summary')
+        for labels, sketch in sketches:
+            for q in QUANTILES:
+                self._sample(name, {**labels, 'quantile': q}, sketch.quantile(q))
+            self._sample(name + '_sum', labels, sketch.sum)
+            self._sample(name + '_count', labels, sketch.count)
+
+    def render(self):
+        return '\n'.join(self.lines) + '\n'
+
+
+def render_metrics(osc_protocol=None, dispatcher=None):
+    w = MetricsWriter()
+
+    # OSC receive path, only the fast path / batch receivers keep datagram counters
+    osc = getattr(osc_protocol, 'stats', None)
+    if osc is not None:
+        w.metric('osc_datagrams_received_total', 'counter', 'OSC datagrams read from the socket.', [({}, osc['received'])])
+        w.metric('osc_datagrams_matched_total', 'counter', 'OSC datagrams decoded on the fast path and handed to a handler.', [({}, osc['fast'])])
+        w.metric('osc_datagrams_fallback_total', 'counter', 'OSC datagrams handed to pythonosc (bundles, patterns, other types).', [({}, osc['fallback'])])
+        w.metric('osc_datagrams_dropped_total', 'counter', 'OSC datagrams without a handler for their address.', [({}, osc['dropped'])])
+        if 'overflow' in osc:
+            w.metric('osc_datagrams_overflow_total', 'counter', 'OSC samples lost to a full batch receiver ring.', [({}, osc['overflow'])])
+    if dispatcher is not None:
+        w.metric('osc_route_lookups_total', 'counter', 'Router lookups by result.', [
+            ({'result': 'routed'}, dispatcher.stats['routed']),
+            ({'result': 'unmatched'}, dispatcher.stats['unmatched']),
+        ])
+
+    # Wave feeders
+    channels = list(FEEDER_STATS.items())
+    w.metric('feeder_ticks_total', 'counter', 'Frames evaluated by the wave feeder.', [({'channel': c}, s['ticks']) for c, s in channels])
+    w.metric('feeder_overruns_total', 'counter', 'Feeder deadlines missed by more than one frame.', [({'channel': c}, s['overruns']) for c, s in channels])
+    w.metric('feeder_wakeups_total', 'counter', 'Times the feeder coroutine resumed.', [({'channel': c}, s['wakeups']) for c, s in channels])
+    w.metric('feeder_parks_total', 'counter', 'Times the feeder parked on an idle channel.', [({'channel': c}, s['parks']) for c, s in channels])
+    w.metric('feeder_drift_seconds', 'gauge', 'Lateness of the last feeder tick vs its deadline.', [({'channel': c}, s['drift_last_ms'] / 1000) for c, s in channels])
+    w.summary('frame_latency_seconds', 'OSC receive to WebSocket write latency by stage.', [
+        ({'channel': c, 'stage': stage}, sketch) for c, stages in LATENCY.items() for stage, sketch in stages.items()
+    ])
+
+    # DG-Lab WebSocket connections
+    conns = list(WS_CONNECTIONS)
+    w.metric('ws_connections', 'gauge', 'Connected DG-Lab apps.', [({}, len(conns))])
+    sent, sent_bytes, dropped, coalesced, depth = [], [], [], [], []
+    for conn in conns:
+        stats = conn.outbound.stats
+        device = {'device': conn.uuid[:8]}
+        for kind, counts in stats['by_kind'].items():
+            sent.append(({**device, 'kind': kind}, counts['sent']))
+            sent_bytes.append(({**device, 'kind': kind}, counts['bytes']))
+        dropped.append((device, stats['dropped']))
+        coalesced.append((device, stats['coalesced']))
+        depth.append((device, conn.outbound.qsize()))
+    w.metric('ws_messages_sent_total', 'counter', 'WebSocket messages written per connection and message kind.', sent)
+    w.metric('ws_bytes_sent_total', 'counter', 'WebSocket payload bytes written per connection and message kind.', sent_bytes)
+    w.metric('ws_outbound_dropped_total', 'counter', 'Messages dropped from a full outbound queue.', dropped)
+    w.metric('ws_outbound_coalesced_total', 'counter', 'Messages superseded before being sent.', coalesced)
+    w.metric('ws_outbound_depth', 'gauge', 'Messages waiting in the outbound queue.', depth)
+
+    # Tuya
+    tuya = list(enumerate(TUYA_CONNECTIONS))
+    w.metric('tuya_connections', 'gauge', 'Tuya cloud connections.', [({}, len(tuya))])
+    w.metric('tuya_commands_sent_total', 'counter', 'Tuya device commands sent.', [({'connection': i}, c.stats['sent']) for i, c in tuya])
+    w.metric('tuya_commands_failed_total', 'counter', 'Tuya device commands that raised or were rejected by the API.', [({'connection': i}, c.stats['failed']) for i, c in tuya])
+    w.metric('tuya_commands_coalesced_total', 'counter', 'Tuya commands superseded before being sent.', [({'connection': i}, c.stats['coalesced']) for i, c in tuya])
+    w.metric('tuya_commands_throttled_total', 'counter', 'Tuya commands delayed by the rate limiter.', [({'connection': i}, c.stats['throttled']) for i, c in tuya])
+    w.summary('tuya_command_latency_seconds', 'Tuya command submit to HTTP response latency.', [({'connection': i}, c.latency) for i, c in tuya])
+
+    # Event loop
+    w.summary('event_loop_lag_seconds', 'Event loop lag seen by the loop monitor probe.', [({}, LOOP_MONITOR.lag)])
+    w.metric('event_loop_lag_last_seconds', 'gauge', 'Lag of the last loop monitor probe.', [({}, LOOP_MONITOR.stats['lag_last_ms'] / 1000)])
+    w.metric('event_loop_slow_callbacks_total', 'counter', 'Callbacks that blocked the loop for longer than the slow threshold.', [({}, LOOP_MONITOR.stats['slow_callbacks'])])
+    w.metric('event_loop_slow_seconds_total', 'counter', 'Loop lag spent in slow callbacks.', [({}, LOOP_MONITOR.stats['slow_ms'] / 1000)])
+    w.metric('event_loop_tasks', 'gauge', 'Live asyncio tasks by coroutine name.', [({'coroutine': name}, n) for name, n in LOOP_MONITOR.tasks.items()])
+    return w.render()
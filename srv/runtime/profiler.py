@@ -0,0 +1,143 @@
+import asyncio, functools, inspect, os, threading, time
+
+from .loop_monitor import coro_name
+
+perf_counter_ns = time.perf_counter_ns
+
+
+def current_track():
+    """Timeline row of a span: the running task, or the thread outside of one."""
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        task = None
+    if task is None:
+        return threading.current_thread().name
+    return f'{coro_name(task)} [{task.get_name()}]'
+
+
+class Lap():
+    """Back to back spans of one loop iteration, `lap(stage)` closes the stage that just ran."""
+    __slots__ = ('profiler', 'prefix', 'track', 'start', 'last')
+
+    def __init__(self, profiler, prefix) -> None:
+        self.profiler = profiler
+        self.prefix = prefix
+        self.track = current_track()
+        self.start = self.last = perf_counter_ns()
+
+    def __call__(self, stage):
+        now = perf_counter_ns()
+        self.profiler.add(f'{self.prefix}.{stage}', self.track, self.last, now - self.last)
+        self.last = now
+
+    def done(self):
+        self.profiler.add(self.prefix, self.track, self.start, perf_counter_ns() - self.start)
+
+
+class Profiler():
+    """Stage spans in a fixed-size ring, exported as Chrome trace events.
+
+    Instrumented code checks `enabled` before taking any timestamp, so a
+    disabled profiler costs one attribute read per stage. Once the ring is
+    full the oldest spans are overwritten. The GUI and web server threads
+    clear and export while the loop records, and a profiled function may run
+    off the loop thread, so the ring is only touched under `lock`.
+    """
+    def __init__(self, size=1 << 16) -> None:
+        self.size = size
+        self.ring = [None] * size  # (name, track, start_ns, duration_ns)
+        self.pos = 0
+        self.enabled = False
+        self.lock = threading.Lock()
+        # Fixed for the process, a span still open across clear() must not go negative
+        self.epoch_ns = perf_counter_ns()
+
+    def start(self):
+        self.clear()
+        self.enabled = True
+
+    def stop(self):
+        self.enabled = False
+
+    def clear(self):
+        with self.lock:
+            self.ring = [None] * self.size
+            self.pos = 0
+
+    def add(self, name, track, start_ns, duration_ns):
+        with self.lock:
+            self.ring[self.pos % self.size] = (name, track, start_ns, duration_ns)
+            self.pos += 1
+
+    def record(self, name, start_ns):
+        """Span from start_ns to now on the current track."""
+        self.add(name, current_track(), start_ns, perf_counter_ns() - start_ns)
+
+    def lap(self, prefix):
+        return Lap(self, prefix)
+
+    def spans(self):
+        with self.lock:
+            if self.pos <= self.size:
+                return self.ring[:self.pos]
+            head = self.pos % self.size
+            return self.ring[head:] + self.ring[:head]
+
+    def status(self):
+        return {
+            'enabled': self.enabled,
+            'spans': min(self.pos, self.size),
+            'capacity': self.size,
+            'overwritten': max(0, self.pos - self.size),
+        }
+
+    def export(self):
+        """Chrome trace event JSON (chrome://tracing, ui.perfetto.dev)."""
+        pid = os.getpid()
+        tids = {}
+        events = []
+        for name, track, start_ns, duration_ns in self.spans():
+            tid = tids.setdefault(track, len(tids) + 1)
+            events.append({
+                'name': name, 'cat': name.split('.', 1)[0], 'ph': 'X', 'pid': pid, 'tid': tid,
+                'ts': (start_ns - self.epoch_ns) / 1000, 'dur': duration_ns / 1000,
+            })
+        for track, tid in tids.items():
+            events.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': track}})
+        return {
+            'traceEvents': events,
+            'displayTimeUnit': 'ms',
+            'otherData': self.status(),
+        }
+
+
+# Shared profiler of the server hot paths
+PROFILER = Profiler()
+
+
+def profiled(name):
+    """Record every call of the decorated function or coroutine function as a `name` span."""
+    def decorate(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                if not PROFILER.enabled:
+                    return await func(*args, **kwargs)
+                start = perf_counter_ns()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    PROFILER.record(name, start)
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not PROFILER.enabled:
+                    return func(*args, **kwargs)
+                start = perf_counter_ns()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    PROFILER.record(name, start)
+        return wrapper
+    return decorate
@@ -0,0 +1,181 @@
+import asyncio, math, traceback
+from loguru import logger
+
+
+class Timer():
+    """A re-armable deadline registered with a TimerWheel."""
+    __slots__ = ('wheel', 'callback', 'interval', 'name', 'deadline', 'tick', 'active')
+
+    def __init__(self, wheel, callback, interval=None, name=None) -> None:
+        self.wheel = wheel
+        self.callback = callback
+        self.interval = interval
+        self.name = name or getattr(callback, '__qualname__', 'timer')
+        self.deadline = 0.0
+        self.tick = None   # Wheel tick of the slot this timer currently sits in
+        self.active = False
+
+    def __repr__(self):
+        return f"<Timer {self.name} active={self.active} deadline={self.deadline:.3f}>"
+
+    def rearm(self, delay=None):
+        """(Re)schedule the timer `delay` seconds from now, no new task is created."""
+        if delay is None:
+            delay = self.interval
+        self.wheel._arm(self, self.wheel.time() + delay)
+
+    def cancel(self):
+        self.wheel._disarm(self)
+
+
+class TimerWheel():
+    """Hashed timing wheel driven by a single asyncio task.
+
+    Every periodic job and timeout in srv/ registers here instead of running its
+    own `while 1: await asyncio.sleep()` loop. Callbacks may be plain functions or
+    coroutine functions; plain callbacks run inline in the driver, coroutines are
+    started as their own task so a slow one does not hold back other timers.
+    """
+    def __init__(self, tick=0.05, slots=512) -> None:
+        self.tick_size = tick
+        self.slots = [set() for _ in range(slots)]
+        self.current_tick = 0
+        self.loop = None
+        self.driver = None
+        self.wakeup = None
+        self.tasks = set()    # Running coroutine callbacks, referenced until done
+        self.stats = {
+            'scheduled': 0,   # Arm requests (including re-arms)
+            'rearmed': 0,     # Arm requests for timers that were already pending
+            'fired': 0,
+            'cancelled': 0,
+            'active': 0,      # Currently pending timers
+        }
+
+    def time(self):
+        return self.loop.time() if self.loop is not None else asyncio.get_running_loop().time()
+
+    def timer(self, callback, interval=None, name=None) -> Timer:
+        """Create an unarmed timer, arm it later with `rearm`."""
+        return Timer(self, callback, interval=interval, name=name)
+
+    def call_later(self, delay, callback, name=None) -> Timer:
+        timer = Timer(self, callback, name=name)
+        timer.rearm(delay)
+        return timer
+
+    def call_every(self, interval, callback, delay=None, name=None) -> Timer:
+        timer = Timer(self, callback, interval=interval, name=name)
+        timer.rearm(interval if delay is None else delay)
+        return timer
+
+    def _ensure_driver(self):
+        loop = asyncio.get_running_loop()
+        if self.loop is not loop or self.driver is None or self.driver.done():
+            # New event loop (e.g. GUI server restart): drop timers of the old one
+            for slot in self.slots:
+                for timer in slot:
+                    timer.active = False
+                    timer.tick = None
+                slot.clear()
+            self.stats['active'] = 0
+            self.loop = loop
+            self.current_tick = math.floor(loop.time() / self.tick_size)
+            self.wakeup = asyncio.Event()
+            self.driver = loop.create_task(self._run())
+
+    def _insert(self, timer: Timer):
+        tick = max(math.ceil(timer.deadline / self.tick_size), self.current_tick)
+        timer.tick = tick
+        self.slots[tick % len(self.slots)].add(timer)
+
+    def _remove(self, timer: Timer):
+        if timer.tick is not None:
+            self.slots[timer.tick % len(self.slots)].discard(timer)
+            timer.tick = None
+
+    def _arm(self, timer: Timer, deadline):
+        self._ensure_driver()
+        self.stats['scheduled'] += 1
+        if timer.active:
+            self.stats['rearmed'] += 1
+            old_deadline = timer.deadline
+            timer.deadline = deadline
+            if deadline >= old_deadline:
+                # Lazy: the timer is moved when its old slot comes up
+                return
+            self._remove(timer)
+        else:
+            timer.active = True
+            timer.deadline = deadline
+            self.stats['active'] += 1
+        self._insert(timer)
+        self.wakeup.set()
+
+    def _disarm(self, timer: Timer):
+        if not timer.active:
+            return
+        self._remove(timer)
+        timer.active = False
+        self.stats['active'] -= 1
+        self.stats['cancelled'] += 1
+
+    def _task_done(self, task: asyncio.Task):
+        self.tasks.discard(task)
+        if task.cancelled():
+            return
+        exc = task.exception()
+        if exc is not None:
+            tb = ''.join(traceback.format_exception(type(exc), exc, exc.__traceback__))
+            logger.error(f'Timer {task.get_name()} failed: {tb}')
+
+    def _fire(self, timer: Timer, now):
+        self._remove(timer)
+        if timer.interval:
+            timer.deadline += timer.interval
+            if timer.deadline <= now:
+                timer.deadline = now + timer.interval
+            self._insert(timer)
+        else:
+            timer.active = False
+            self.stats['active'] -= 1
+        self.stats['fired'] += 1
+        try:
+            ret = timer.callback()
+        except Exception:
+            logger.error(f'Timer {timer.name} failed: {traceback.format_exc()}')
+            return
+        if asyncio.iscoroutine(ret):
+            task = self.loop.create_task(ret, name=timer.name)
+            self.tasks.add(task)
+            task.add_done_callback(self._task_done)
+
+    async def _run(self):
+        loop = self.loop
+        n_slots = len(self.slots)
+        while 1:
+            if self.stats['active'] == 0:
+                self.wakeup.clear()
+                await self.wakeup.wait()
+                self.current_tick = max(self.current_tick, math.floor(loop.time() / self.tick_size))
+            now = loop.time()
+            target_tick = math.floor(now / self.tick_size)
+            while self.current_tick <= target_tick:
+                tick = self.current_tick
+                # Advance first so timers armed by callbacks land in a later slot
+                self.current_tick += 1
+                slot = self.slots[tick % n_slots]
+                for timer in list(slot):
+                    if timer.tick != tick:
+                        continue  # Remaining rounds, wait for a later lap
+                    if timer.deadline <= now:
+                        self._fire(timer, now)
+                    else:
+                        # Re-armed to a later deadline, move to its new slot
+                        slot.discard(timer)
+                        self._insert(timer)
+            await asyncio.sleep(max(0, self.current_tick * self.tick_size - loop.time()))
+
+
+# Shared timer service for every periodic job / timeout of the server
+TIMERS = TimerWheel()
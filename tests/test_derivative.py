@@ -0,0 +1,47 @@
+import collections, random
+from types import SimpleNamespace
+
+import pytest
+
+from srv.handler.derivative import StreamingDerivative
+from srv.handler.shock_handler import ShockHandler
+
+
+def numpy_values(samples):
+    handler = SimpleNamespace(touch_dist_arr=collections.deque(samples))
+    return ShockHandler.compute_derivative_numpy(handler)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_streaming_matches_numpy(seed):
+    rng = random.Random(seed)
+    stream = StreamingDerivative()
+    samples = []
+    t = 100.0
+    for _ in range(200):
+        # Uneven OSC arrival times, contact that moves in steps and jumps
+        t += rng.uniform(0.005, 0.1)
+        distance = min(1.0, max(0.0, (samples[-1][1] if samples else 0.0) + rng.uniform(-0.3, 0.3)))
+        samples.append((t, distance))
+        stream.append(t, distance)
+        assert stream.values() == pytest.approx(numpy_values(samples), rel=1e-6, abs=1e-6)
+
+
+def test_short_history_and_reset():
+    stream = StreamingDerivative()
+    for i in range(3):
+        assert stream.append(i * 0.05, 0.5) == (0, 0, 0, 0)
+    assert stream.append(0.15, 0.5) != (0, 0, 0, 0)
+    stream.reset()
+    assert len(stream) == 0
+    assert stream.values() == (0, 0, 0, 0)
+
+
+def test_repeated_timestamp_keeps_latest_value():
+    stream = StreamingDerivative()
+    for i in range(5):
+        stream.append(i * 0.05, 0.1 * i)
+    stream.append(0.2, 0.9)
+    assert len(stream) == 5
+    samples = [(i * 0.05, 0.1 * i) for i in range(4)] + [(0.2, 0.9)]
+    assert stream.values() == pytest.approx(numpy_values(samples))
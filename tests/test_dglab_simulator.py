@@ -0,0 +1,45 @@
+import asyncio
+
+from websockets.server import serve as wsserve
+
+from srv import WS_CONNECTIONS
+from srv.connector.coyotev3ws import DGConnection
+from dglab_simulator import SimulatorStats, run_simulator
+
+SETTINGS = {
+    'ws': {'master_uuid': 'master'},
+    'dglab3': {'channel_a': {'strength_limit': 100}, 'channel_b': {'strength_limit': 100}},
+}
+WAVE = '["0A0A0A0A32323232","0A0A0A0A32323232"]'
+
+
+def test_virtual_devices_against_server():
+    async def handler(connection):
+        await DGConnection(connection, SETTINGS=SETTINGS).serve()
+
+    async def broadcast(stop):
+        while not stop.is_set():
+            await DGConnection.broadcast_wave('A', wavestr=WAVE)
+            await asyncio.sleep(0.2)
+
+    async def run():
+        async with wsserve(handler, '127.0.0.1', 0) as server:
+            port = server.sockets[0].getsockname()[1]
+            stop = asyncio.Event()
+            sender = asyncio.ensure_future(broadcast(stop))
+            stats = await run_simulator(
+                f'ws://127.0.0.1:{port}/master', 'master', devices=3, duration=1.0,
+                stats=SimulatorStats(), probe_interval=0.2,
+            )
+            stop.set()
+            await sender
+        return stats
+    stats = asyncio.run(run())
+    assert stats.connected == stats.bound == 3
+    assert stats.failed == 0
+    # Every device got the broadcast pulses, two frames each
+    assert stats.messages['pulse'] >= 3
+    assert stats.frames['A'] == 2 * stats.messages['pulse']
+    # Probes report a strength below the limit, the server corrects it to 100
+    assert stats.echo_latency['A'] or stats.echo_latency['B']
+    assert not WS_CONNECTIONS
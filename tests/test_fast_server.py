@@ -0,0 +1,80 @@
+import pytest
+from pythonosc.osc_bundle_builder import OscBundleBuilder, IMMEDIATELY
+from pythonosc.osc_message import OscMessage
+from pythonosc.osc_message_builder import OscMessageBuilder, build_msg
+
+from srv.handler.base_handler import BaseHandler
+from srv.osc.fast_server import OSCFastProtocol, FALLBACK
+from srv.osc.router import OSCRouter
+
+# Every address length mod 4, so the tag string starts at each padding offset
+ADDRESSES = ['/' + 'abcdefgh'[:n] for n in range(1, 9)]
+ARGS = [0.0, 0.25, 1.0, 7.5, -2.0, 0, 1, 5, -3, True, False]
+
+
+class Handler():
+    def osc_handler(self, address, *args):
+        pass
+
+    def osc_value_handler(self, address, val, t=None):
+        pass
+
+
+def protocol(addresses=ADDRESSES):
+    router = OSCRouter()
+    handler = Handler()
+    for address in addresses:
+        router.map(address, handler.osc_handler)
+    return OSCFastProtocol(router)
+
+
+@pytest.mark.parametrize('address', ADDRESSES)
+@pytest.mark.parametrize('arg', ARGS, ids=repr)
+def test_decode_matches_param_sanitizer(address, arg):
+    dgram = build_msg(address, [arg]).dgram
+    expected = BaseHandler.param_sanitizer(OscMessage(dgram).params)
+    decoded_address, value_handlers, val = protocol().decode(dgram)
+    assert decoded_address == address
+    assert len(value_handlers) == 1
+    assert val == expected
+    assert type(val) is type(expected)
+
+
+def test_unmapped_address_is_dropped():
+    assert protocol().decode(build_msg('/avatar/parameters/VelocityX', [0.5]).dgram) == ()
+
+
+def multi_arg():
+    builder = OscMessageBuilder('/abc')
+    builder.add_arg(0.5)
+    builder.add_arg(0.5)
+    return builder.build().dgram
+
+
+def string_arg():
+    return build_msg('/abc', ['on']).dgram
+
+
+def bundle():
+    builder = OscBundleBuilder(IMMEDIATELY)
+    builder.add_content(build_msg('/abc', [0.5]))
+    return builder.build().dgram
+
+
+def pattern_address():
+    return build_msg('/ab?', [0.5]).dgram
+
+
+def truncated():
+    return build_msg('/abc', [0.5]).dgram[:-2]
+
+
+@pytest.mark.parametrize('make', [multi_arg, string_arg, bundle, pattern_address, truncated])
+def test_fallback_to_pythonosc(make):
+    assert protocol().decode(make()) is FALLBACK
+
+
+def test_handler_with_extra_args_falls_back():
+    router = OSCRouter()
+    router.map('/abc', Handler().osc_handler, 'extra')
+    assert OSCFastProtocol(router).decode(build_msg('/abc', [0.5]).dgram) is FALLBACK
@@ -0,0 +1,41 @@
+import random
+
+import pytest
+
+from srv.runtime.latency import LatencySketch
+
+
+def exact_quantile(values, q):
+    values = sorted(values)
+    return values[int(q * (len(values) - 1))]
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_quantiles_within_accuracy(seed):
+    rng = random.Random(seed)
+    # Long-tailed like real frame latency: mostly ms, a few stalls
+    values = [rng.lognormvariate(-6, 1.0) for _ in range(20000)] + [rng.uniform(0.1, 2.0) for _ in range(200)]
+    sketch = LatencySketch(accuracy=0.02)
+    for value in values:
+        sketch.add(value)
+    for q in (0.01, 0.25, 0.5, 0.9, 0.95, 0.99, 0.999, 1.0):
+        assert sketch.quantile(q) == pytest.approx(exact_quantile(values, q), rel=0.02)
+    assert sketch.quantile(1.0) <= sketch.max == max(values)
+    assert sketch.count == len(values)
+    assert sketch.sum == pytest.approx(sum(values))
+
+
+def test_out_of_range_and_reset():
+    sketch = LatencySketch(min_value=1e-5, max_value=1.0)
+    assert sketch.quantile(0.5) == 0.0
+    sketch.add(0.0)
+    sketch.add(50.0)
+    # Clamped to the first / last bucket, the exact max is still kept
+    assert sketch.quantile(0.0) <= 1e-5
+    assert sketch.quantile(1.0) == pytest.approx(1.0, rel=0.03)
+    assert sketch.max == 50.0
+    summary = sketch.summary()
+    assert summary['n'] == 2 and summary['max'] == 50000.0
+    sketch.reset()
+    assert sketch.count == 0 and sketch.max == 0.0
+    assert sketch.summary()['p99'] == 0.0
@@ -0,0 +1,40 @@
+import asyncio, threading, time
+
+from srv.runtime.loop_monitor import LoopMonitor
+
+
+def test_stall_attributed_to_blocking_task():
+    async def hog():
+        await asyncio.sleep(0.1)
+        time.sleep(0.3)  # Blocks the loop like a synchronous HTTP call
+
+    async def run():
+        monitor = LoopMonitor(interval=0.01, slow_threshold=0.05)
+        monitor.start()
+        await asyncio.sleep(0.05)
+        await asyncio.create_task(hog())
+        await asyncio.sleep(0.05)
+        return monitor
+    monitor = asyncio.run(run())
+    entry = monitor.slow_log[-1]
+    assert entry['task'] == 'test_stall_attributed_to_blocking_task.<locals>.hog'
+    assert any('in hog' in line for line in entry['stack'])
+
+
+def test_sample_discarded_when_loop_moves_on():
+    monitor = LoopMonitor(interval=0.01, slow_threshold=0.02)
+
+    class Loop():
+        def is_running(self):
+            return True
+    monitor.loop = Loop()
+    monitor.beat = time.monotonic() - 1
+
+    def sample_stall():
+        # The stalled callback returns while the watchdog samples
+        monitor.beat = time.monotonic()
+        return {'task': 'next callback', 'stack': []}
+    monitor.sample_stall = sample_stall
+    threading.Thread(target=monitor._watch, daemon=True).start()
+    time.sleep(0.1)
+    assert monitor.stall is None
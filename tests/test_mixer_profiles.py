@@ -0,0 +1,81 @@
+from srv.osc.mixer import ParamMixer
+from srv.osc.profiles import channel_router, build_routing
+from srv.osc.router import OSCRouter
+
+
+class FakeHandler():
+    ingest = None
+    resampler = None
+    sample_timeout = 0.5
+
+    def __init__(self, channel) -> None:
+        self.channel = channel
+        self.woken = 0
+
+    def clear_after(self, timeout):
+        pass
+
+    def on_sample(self):
+        self.woken += 1
+
+
+def setup(default_params, profiles):
+    dispatcher = OSCRouter()
+    mixer = ParamMixer()
+    handlers = {name: FakeHandler(name[-1].upper()) for name in default_params}
+    routers = {name: channel_router(h, {'mix_mode': 'max'}, mixer) for name, h in handlers.items()}
+    build_routing(dispatcher, routers, default_params, profiles=profiles, mixer=mixer)
+    return dispatcher, mixer, handlers
+
+
+def send(dispatcher, address, val):
+    for callback in dispatcher.route(address):
+        callback.callback(address, val)
+
+
+def test_profile_param_only_drives_its_channel():
+    dispatcher, mixer, handlers = setup(
+        {'channel_a': ['/d'], 'channel_b': ['/p']},
+        {'avtr_x': {'channel_a': ['/p'], 'channel_b': []}},
+    )
+    a, b = handlers['channel_a'], handlers['channel_b']
+
+    dispatcher.avatar_change('/avatar/change', 'avtr_x')
+    send(dispatcher, '/p', 0.9)
+    assert [v for _, v in a.ingest.consume()] == [0.9]
+    assert b.ingest.consume() == []
+    assert (a.woken, b.woken) == (1, 0)
+
+    # Back on the default table /p belongs to channel B only
+    dispatcher.avatar_change('/avatar/change', 'avtr_unknown')
+    send(dispatcher, '/p', 0.4)
+    assert a.ingest.consume() == []
+    assert [v for _, v in b.ingest.consume()] == [0.4]
+    assert (a.woken, b.woken) == (1, 1)
+
+
+def test_shared_param_and_weights():
+    dispatcher, mixer, handlers = setup({'channel_a': ['/s', '/a'], 'channel_b': ['/s']}, None)
+    a, b = handlers['channel_a'], handlers['channel_b']
+    send(dispatcher, '/s', 0.5)
+    send(dispatcher, '/a', 0.7)
+    assert [v for _, v in a.ingest.consume()] == [0.7]
+    assert [v for _, v in b.ingest.consume()] == [0.5]
+    assert mixer.stats['received'] == 2
+
+
+def test_avatar_change_forgets_values_without_clearing_inputs():
+    dispatcher, mixer, handlers = setup({'channel_a': ['/s', '/a']}, {'avtr_x': {'channel_a': ['/s']}})
+    a = handlers['channel_a']
+    send(dispatcher, '/s', 0.5)
+    send(dispatcher, '/a', 0.7)
+    assert [v for _, v in a.ingest.consume()] == [0.7]
+
+    dispatcher.avatar_change('/avatar/change', 'avtr_x')
+    assert a.ingest.consume() == []
+    # Stale values stay in their slots but no longer count, nor deduplicate
+    assert mixer.inputs['/s'].slots
+    send(dispatcher, '/s', 0.5)
+    assert [v for _, v in a.ingest.consume()] == [0.5]
+    assert mixer.stats['deduplicated'] == 0
+    assert a.ingest.stats['inputs'] == 1
@@ -0,0 +1,58 @@
+import threading
+
+from srv.osc.recorder import OSCRecorder, read_recording
+from srv.osc.fast_server import OSCFastProtocol
+from srv.osc.router import OSCRouter
+
+
+def test_round_trip_and_sessions(tmp_path):
+    path = str(tmp_path / 'session.svosc')
+    recorder = OSCRecorder(path)
+    recorder.record(b'/a\x00\x00,f\x00\x00\x00\x00\x00\x00')
+    recorder.record(b'')  # Must not be read back as a session marker
+    recorder.record(b'/b\x00\x00,f\x00\x00\x00\x00\x00\x00')
+    recorder.close()
+    recorder = OSCRecorder(path)
+    recorder.record(b'/c\x00\x00,f\x00\x00\x00\x00\x00\x00')
+    recorder.close()
+
+    items = list(read_recording(path))
+    assert [item[1][:2] if item else None for item in items] == [None, b'/a', b'/b', None, b'/c']
+    assert recorder.stats['recorded'] == 1
+
+
+def test_close_is_idempotent_and_stops_recording(tmp_path):
+    recorder = OSCRecorder(str(tmp_path / 'r.svosc'))
+    recorder.close()
+    recorder.close()
+    recorder.record(b'/late\x00\x00\x00,f\x00\x00\x00\x00\x00\x00')
+    assert recorder.stats['recorded'] == 0
+
+
+def test_close_while_recording(tmp_path):
+    path = str(tmp_path / 'race.svosc')
+    recorder = OSCRecorder(path)
+    data = b'/x\x00\x00,f\x00\x00\x00\x00\x00\x00'
+    errors = []
+    def spam():
+        try:
+            for _ in range(200000):
+                recorder.record(data)
+        except Exception as e:
+            errors.append(e)
+    thread = threading.Thread(target=spam)
+    thread.start()
+    recorder.close()
+    thread.join()
+    assert not errors
+    # Every record in the file is complete
+    records = [item for item in read_recording(path) if item is not None]
+    assert len(records) == recorder.stats['recorded']
+    assert all(d == data for _, d in records)
+
+
+def test_protocol_closes_recorder_when_stopped(tmp_path):
+    recorder = OSCRecorder(str(tmp_path / 'p.svosc'))
+    protocol = OSCFastProtocol(OSCRouter(), recorder=recorder)
+    protocol.connection_lost(None)
+    assert recorder.file.closed
@@ -0,0 +1,56 @@
+import asyncio
+
+from srv.connector.coyotev3ws import DGConnection, OutboundQueue
+
+SETTINGS = {
+    'ws': {'master_uuid': 'master'},
+    'dglab3': {'channel_a': {'strength_limit': 100}, 'channel_b': {'strength_limit': 100}},
+}
+
+
+class FailingWS():
+    id = 'fake-device'
+
+    def __init__(self, fail_after) -> None:
+        self.fail_after = fail_after
+        self.sent = []
+        self.close_code = None
+
+    async def send(self, msg):
+        if len(self.sent) >= self.fail_after:
+            raise ValueError('encoder broke')
+        self.sent.append(msg)
+
+    async def close(self, code=1000):
+        self.close_code = code
+
+
+def test_writer_failure_closes_connection():
+    async def run():
+        ws = FailingWS(fail_after=1)
+        conn = DGConnection(ws, SETTINGS=SETTINGS)
+        conn.enqueue('first')
+        conn.enqueue('second')
+        await asyncio.wait_for(conn.outbound_writer(), 2)
+        return ws
+    ws = asyncio.run(run())
+    assert ws.sent == ['first']
+    assert ws.close_code == 1011
+
+
+def test_queue_priority_and_coalescing():
+    async def run():
+        queue = OutboundQueue()
+        queue.put('p1', kind='pulse', channel='A')
+        queue.put('s1', kind='strength', channel='A')
+        queue.put('s2', kind='strength', channel='A')
+        queue.put('c', kind='control')
+        queue.put('k', kind='keepalive', channel='B')
+        queue.put('clr', kind='clear', channel='A')  # Drops A's pending pulse
+        out = []
+        while (item := queue.get_nowait()) is not None:
+            out.append(item[:2])
+        return out, queue.stats
+    out, stats = asyncio.run(run())
+    assert out == [('c', 'control'), ('clr', 'clear'), ('s2', 'strength'), ('k', 'keepalive')]
+    assert stats['coalesced'] == 2
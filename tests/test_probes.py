@@ -0,0 +1,27 @@
+import json
+
+from dglab_simulator import SimulatorStats, VirtualDevice
+from osc_workload import Probe, WorkloadStats
+
+KEEPALIVE_WAVE = json.dumps(['0101010101010101'])
+
+
+def test_workload_probe_ignores_keepalive_pulses():
+    stats = SimulatorStats()
+    probe = Probe('/avatar/parameters/Probe', 'A', 1.0, stats, WorkloadStats())
+    probe.sent_at = 10.0
+    probe.on_pulse('A', KEEPALIVE_WAVE, 10.1)
+    probe.on_pulse('A', json.dumps(['0A0A0A0A00000000']), 10.2)
+    assert stats.probe_latency == []
+    probe.on_pulse('A', json.dumps(['0A0A0A0A00326464']), 10.3)
+    assert stats.probe_latency == [10.3 - 10.0]
+    assert probe.sent_at is None
+
+
+def test_strength_echo_only_matches_probe_correction():
+    device = VirtualDevice('ws://unused', 'master', SimulatorStats())
+    device.probe_value['A'] = 2
+    assert not device.is_probe_reply('A', '2', 1)    # keepalive
+    assert not device.is_probe_reply('A', '2', 2)    # probed value itself
+    assert not device.is_probe_reply('A', '1', 5)    # relative change
+    assert device.is_probe_reply('A', '2', 100)      # corrected to the limit
@@ -0,0 +1,79 @@
+import asyncio, threading
+
+from pythonosc.osc_message_builder import build_msg
+
+from srv.connector.coyotev3ws import DGConnection
+from srv.handler.base_handler import BaseHandler
+from srv.osc.fast_server import OSCFastProtocol
+from srv.osc.ingest import SampleSlots
+from srv.osc.router import OSCRouter
+from srv.runtime.profiler import PROFILER, Profiler, perf_counter_ns
+
+
+def test_concurrent_adds_keep_every_span():
+    profiler = Profiler(size=1 << 16)
+    profiler.start()
+
+    def record(track):
+        for i in range(5000):
+            profiler.add('stage', track, perf_counter_ns(), 1)
+    threads = [threading.Thread(target=record, args=(f't{i}',)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert profiler.status()['spans'] == 20000
+    assert None not in profiler.spans()
+
+
+def test_lap_open_across_clear_has_no_negative_timestamp():
+    profiler = Profiler()
+    profiler.start()
+    lap = profiler.lap('feeder_tick')
+    profiler.clear()
+    lap('ingest')
+    lap.done()
+    events = [e for e in profiler.export()['traceEvents'] if e['ph'] == 'X']
+    assert [e['name'] for e in events] == ['feeder_tick.ingest', 'feeder_tick']
+    assert all(e['ts'] >= 0 and e['dur'] >= 0 for e in events)
+
+
+def test_hot_path_stages_record_spans():
+    class Handler(BaseHandler):
+        sample_timeout = 0.5
+        def __init__(self):
+            self.ingest = SampleSlots()
+        def clear_after(self, val):
+            pass
+
+    class WS():
+        id = 'fake-device'
+        async def send(self, msg):
+            pass
+
+    handler = Handler()
+    router = OSCRouter()
+    router.map('/avatar/parameters/Touch', handler.osc_handler)
+    protocol = OSCFastProtocol(router)
+    settings = {
+        'ws': {'master_uuid': 'master'},
+        'dglab3': {'channel_a': {'strength_limit': 100}, 'channel_b': {'strength_limit': 100}},
+    }
+
+    async def run():
+        conn = DGConnection(WS(), SETTINGS=settings)
+        writer = asyncio.ensure_future(conn.outbound_writer())
+        protocol.datagram_received(build_msg('/avatar/parameters/Touch', [0.5]).dgram, ('127.0.0.1', 9001))
+        conn.enqueue(conn.clear_msgs['A'], kind='clear')
+        await asyncio.sleep(0.01)
+        writer.cancel()
+
+    PROFILER.start()
+    try:
+        asyncio.run(run())
+    finally:
+        PROFILER.stop()
+    names = {span[0] for span in PROFILER.spans()}
+    PROFILER.clear()
+    assert {'osc_decode', 'osc_value_handler', 'ws_send'} <= names
+    assert handler.ingest.consume() == [(handler.ingest.slots['/avatar/parameters/Touch'][1], 0.5)]
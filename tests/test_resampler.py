@@ -0,0 +1,67 @@
+import pytest
+
+from srv.osc.resampler import Resampler
+
+ADDR = '/avatar/parameters/Touch'
+
+
+def test_grid_emission_interpolates_and_waits_for_delay():
+    rs = Resampler(rate=100, delay=0.03)
+    for t, val in [(10.000, 0.0), (10.013, 0.13), (10.031, 0.31), (10.052, 0.52)]:
+        rs.push(ADDR, t, val)
+    # Only grid points at least `delay` old are ready
+    early = rs.pull(10.045)
+    assert [g for g, _ in early] == pytest.approx([10.00, 10.01])
+    rest = rs.pull(10.2)
+    grid = [g for g, _ in rest[:-1]]
+    assert grid == pytest.approx([10.02, 10.03, 10.04, 10.05])
+    # Linear between raw samples: value == 10 * time offset here
+    for g, val in early + rest[:-1]:
+        assert val == pytest.approx(10 * (g - 10.0), abs=1e-9)
+    # Quiet input: the newest raw sample closes the stream
+    assert rest[-1] == (10.052, pytest.approx(0.52))
+
+
+def test_quiet_hold_sample_is_emitted_once():
+    rs = Resampler(rate=100, delay=0.03)
+    rs.push(ADDR, 10.0, 0.5)
+    rs.push(ADDR, 10.005, 0.0)   # Contact exit between grid points
+    assert rs.pull(10.02) == []
+    assert rs.pending()
+    assert rs.pull(10.04) == [(10.0, 0.5), (10.005, 0.0)]
+    assert not rs.pending()
+    assert rs.pull(10.5) == []
+
+
+def test_quiet_gap_holds_instead_of_ramping():
+    rs = Resampler(rate=100, delay=0.03)
+    rs.push(ADDR, 10.1, 1.0)
+    assert rs.pull(10.14)[-1] == (10.1, 1.0)
+    # Held at 1.0 for 210ms, VRChat only sends on change
+    rs.push(ADDR, 10.31, 0.0)
+    out = rs.pull(10.4)
+    held = [val for g, val in out if g < 10.31 - 1e-9]
+    assert len(held) == 20
+    assert held == [1.0] * 20
+    assert out[-1] == (10.31, 0.0)
+
+
+def test_long_silence_restarts_grid():
+    rs = Resampler(rate=100, delay=0.03, max_gap=0.5)
+    rs.push(ADDR, 10.0, 0.4)
+    rs.pull(10.1)
+    rs.push(ADDR, 11.0, 0.8)
+    out = rs.pull(11.1)
+    assert rs.stats['restarts'] == 1
+    # No backfill of the second of silence
+    assert [g for g, _ in out][0] >= 11.0
+    assert out[-1] == (11.0, 0.8)
+
+
+def test_addresses_combined_with_max():
+    rs = Resampler(rate=100, delay=0.03)
+    rs.push('/a', 10.0, 0.2)
+    rs.push('/b', 10.0, 0.6)
+    rs.push('/a', 10.02, 0.9)
+    out = rs.pull(10.2)
+    assert [val for _, val in out] == pytest.approx([0.6, 0.6, 0.9])
@@ -0,0 +1,101 @@
+from pythonosc.dispatcher import Dispatcher
+
+from srv.osc.router import OSCRouter
+
+MAPPINGS = [
+    '/avatar/parameters/Shock/TouchAreaA',
+    '/avatar/parameters/Shock/*',
+    '/avatar/parameters/Shock/TouchArea*',
+    '/avatar/parameters/*/Touch*B',
+    '/avatar/change',
+]
+ADDRESSES = [
+    '/avatar/parameters/Shock/TouchAreaA',
+    '/avatar/parameters/Shock/TouchAreaB',
+    '/avatar/parameters/Shock/',
+    '/avatar/parameters/Shock',
+    '/avatar/parameters/Leg/TouchB',
+    '/avatar/parameters/Leg/TouchC',
+    '/avatar/parameters/VelocityX',
+    '/avatar/change',
+    '/avatar',
+    '',
+]
+
+
+def handler(tag):
+    def callback(address, *args):
+        pass
+    callback.tag = tag
+    return callback
+
+
+def build(router):
+    for address in MAPPINGS:
+        router.map(address, handler(address))
+    return router
+
+
+def tags(handlers):
+    return [h.callback.tag for h in handlers]
+
+
+def test_routes_like_pythonosc_dispatcher():
+    router = build(OSCRouter())
+    reference = build(Dispatcher())
+    for address in ADDRESSES:
+        assert tags(router.route(address)) == tags(reference.handlers_for_address(address)), address
+
+
+def test_exact_trie_and_regex_lookups():
+    router = build(OSCRouter())
+    assert tags(router.route('/avatar/parameters/Shock/TouchAreaA')) == MAPPINGS[:3]
+    assert tags(router.route('/avatar/parameters/Shock/Other')) == ['/avatar/parameters/Shock/*']
+    assert tags(router.route('/avatar/parameters/Leg/TouchB')) == ['/avatar/parameters/*/Touch*B']
+    assert router.route('/avatar/parameters/VelocityX') == ()
+
+
+def test_results_are_cached_and_map_invalidates():
+    router = build(OSCRouter())
+    first = router.route('/avatar/parameters/VelocityX')
+    misses = router.stats['cache_misses']
+    assert router.route('/avatar/parameters/VelocityX') is first
+    assert router.stats['cache_misses'] == misses
+
+    router.map('/avatar/parameters/Velocity*', handler('velocity'))
+    assert tags(router.route('/avatar/parameters/VelocityX')) == ['velocity']
+
+
+def test_cache_is_bounded():
+    router = build(OSCRouter())
+    for i in range(OSCRouter.CACHE_SIZE + 10):
+        router.route(f'/avatar/parameters/Spam{i}')
+    assert len(router.index[4]) <= OSCRouter.CACHE_SIZE
+
+
+def test_unmatched_goes_to_default_handler():
+    router = build(OSCRouter())
+    default = handler('default')
+    router.set_default_handler(default)
+    assert tags(router.handlers_for_address('/avatar/parameters/VelocityX')) == ['default']
+    assert router.stats['unmatched'] == 1
+    # Incoming address patterns use the generic matcher
+    pattern = '/avatar/parameters/Shock/TouchArea?'
+    assert tags(router.handlers_for_address(pattern)) == tags(build(Dispatcher()).handlers_for_address(pattern))
+
+
+def test_profiles_switch_tables():
+    router = build(OSCRouter())
+    router.add_profile('avtr_1', [('/avatar/parameters/Zone/Chest', handler('chest'))])
+    switched = []
+    router.profile_listeners.append(switched.append)
+
+    router.avatar_change('/avatar/change', 'avtr_1')
+    assert tags(router.route('/avatar/parameters/Zone/Chest')) == ['chest']
+    assert router.route('/avatar/parameters/Shock/TouchAreaA') == ()
+
+    router.avatar_change('/avatar/change', 'avtr_unknown')
+    assert router.route('/avatar/parameters/Zone/Chest') == ()
+    assert tags(router.route('/avatar/parameters/Shock/TouchAreaA')) == MAPPINGS[:3]
+    assert switched == ['avtr_1', None]
+    assert router.stats['profile_switches'] == 2
@@ -0,0 +1,87 @@
+import asyncio
+
+from srv.runtime.timer_wheel import TimerWheel
+
+
+def test_slow_coroutine_does_not_delay_other_timers():
+    async def run():
+        wheel = TimerWheel(tick=0.01)
+        fired = []
+
+        async def slow():
+            fired.append('slow')
+            await asyncio.sleep(0.5)
+            fired.append('slow-done')
+
+        async def fails():
+            raise ValueError('callback broke')
+
+        wheel.call_later(0.01, slow)
+        wheel.call_later(0.01, fails)
+        wheel.call_later(0.05, lambda: fired.append('fast'))
+        await asyncio.sleep(0.2)
+        # The driver is still alive after a failing callback
+        wheel.call_later(0.01, lambda: fired.append('after'))
+        await asyncio.sleep(0.1)
+        return fired, wheel
+    fired, wheel = asyncio.run(run())
+    assert fired == ['slow', 'fast', 'after']
+    assert wheel.stats['fired'] == 4
+
+
+def test_rearm_moves_deadline_both_ways():
+    async def run():
+        wheel = TimerWheel(tick=0.01)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        fired = {}
+        later = wheel.timer(lambda: fired.setdefault('later', loop.time() - start))
+        sooner = wheel.timer(lambda: fired.setdefault('sooner', loop.time() - start))
+        later.rearm(0.05)
+        later.rearm(0.2)    # Lazy: stays in its old slot until that slot comes up
+        sooner.rearm(0.3)
+        sooner.rearm(0.05)  # Moved to an earlier slot right away
+        await asyncio.sleep(0.1)
+        assert 'later' not in fired
+        await asyncio.sleep(0.2)
+        return fired, wheel
+    fired, wheel = asyncio.run(run())
+    assert 0.05 <= fired['sooner'] < 0.1
+    assert 0.2 <= fired['later'] < 0.3
+    assert wheel.stats['rearmed'] == 2
+    assert wheel.stats['active'] == 0
+
+
+def test_cancel_and_periodic():
+    async def run():
+        wheel = TimerWheel(tick=0.01)
+        fired = []
+        cancelled = wheel.call_later(0.03, lambda: fired.append('cancelled'))
+        periodic = wheel.call_every(0.04, lambda: fired.append('tick'))
+        cancelled.cancel()
+        cancelled.cancel()  # No-op on an inactive timer
+        await asyncio.sleep(0.19)
+        periodic.cancel()
+        await asyncio.sleep(0.1)
+        return fired, wheel
+    fired, wheel = asyncio.run(run())
+    assert 'cancelled' not in fired
+    assert 3 <= fired.count('tick') <= 5
+    assert wheel.stats['cancelled'] == 2
+    assert wheel.stats['active'] == 0
+
+
+def test_callback_can_rearm_itself():
+    async def run():
+        wheel = TimerWheel(tick=0.01)
+        fired = []
+        def again():
+            fired.append(1)
+            if len(fired) < 3:
+                timer.rearm(0.02)
+        timer = wheel.call_later(0.02, again)
+        await asyncio.sleep(0.2)
+        return fired, timer
+    fired, timer = asyncio.run(run())
+    assert len(fired) == 3
+    assert not timer.active
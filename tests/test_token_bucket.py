@@ -0,0 +1,32 @@
+import pytest
+
+from srv.connector import machine_tuya_cloud
+from srv.connector.machine_tuya_cloud import TokenBucket
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(machine_tuya_cloud.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_rate_and_wait_time(clock):
+    bucket = TokenBucket(rate=5)   # One command every 0.2s
+    assert bucket.try_take()
+    assert not bucket.try_take()
+    assert bucket.wait_time() == pytest.approx(0.2)
+    clock[0] += 0.1
+    assert not bucket.try_take()
+    assert bucket.wait_time() == pytest.approx(0.1)
+    clock[0] += 0.1
+    assert bucket.wait_time() == 0.0
+    assert bucket.try_take()
+
+
+def test_burst_capacity_is_capped(clock):
+    bucket = TokenBucket(rate=10, capacity=3)
+    clock[0] += 60  # Idle for a long time does not bank more than capacity
+    assert [bucket.try_take() for _ in range(4)] == [True, True, True, False]
+    clock[0] += 0.25
+    assert [bucket.try_take() for _ in range(3)] == [True, True, False]
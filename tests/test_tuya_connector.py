@@ -0,0 +1,84 @@
+import asyncio, gc, threading
+
+import pytest
+
+import tuya_fake_openapi
+from srv.connector.machine_tuya_cloud import TuYaConnection, TUYA_CONNECTIONS
+
+
+@pytest.fixture
+def fake_openapi():
+    # Tokens within 120s of expiry are refreshed before every command, by the
+    # connection rather than the SDK which only refreshes within 60s
+    server = tuya_fake_openapi.serve(port=0, expire=90)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    tuya_fake_openapi.STATS.update(token=0, commands=0, in_flight=0, max_in_flight=0)
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+    server.server_close()
+
+
+def connect(endpoint, timeout=10):
+    """Construct a TuYaConnection on a helper thread, failing instead of hanging on a deadlock."""
+    result = {}
+    def run():
+        result['conn'] = TuYaConnection('id', 'key', ['d1', 'd2'], api_endpoint=endpoint, cmd_gap=0.01)
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), 'TuYaConnection construction hung'
+    return result['conn']
+
+
+def release(conn):
+    TUYA_CONNECTIONS.remove(conn)
+    conn.executor.shutdown()
+
+
+def test_construction_and_token_refresh(fake_openapi):
+    conn = connect(fake_openapi)
+    try:
+        # connect() plus at least one refresh before the switch commands
+        assert tuya_fake_openapi.STATS['token'] >= 2
+        assert tuya_fake_openapi.STATS['commands'] == 2
+
+        async def send():
+            await asyncio.wait_for(asyncio.gather(*[conn.sendcmd('switch', True) for _ in range(4)]), 10)
+        asyncio.run(send())
+        assert conn.stats['sent'] == 8
+        assert conn.stats['failed'] == 0
+        assert tuya_fake_openapi.STATS['commands'] == 10
+        assert tuya_fake_openapi.STATS['token'] >= 3
+    finally:
+        release(conn)
+        # __del__ switches the devices off, let it run while the server is still up
+        del conn
+        gc.collect()
+
+
+def test_failed_commands_are_not_counted_as_sent(fake_openapi):
+    conn = connect(fake_openapi)
+    post = conn.tyapi.post
+    def flaky_post(path, body=None):
+        if '/d2/' in path:
+            raise ConnectionError('cloud unreachable')
+        if body['commands'][0]['code'] == 'mode':
+            return {'success': False, 'code': 2008, 'msg': 'command or value not support'}
+        return post(path, body)
+    conn.tyapi.post = flaky_post
+    try:
+        async def send():
+            await conn.sendcmd('switch', True)
+            await conn.sendcmd('mode', 'level_A')
+            while any(conn.in_flight.values()) or any(conn.pending.values()):
+                await asyncio.sleep(0.01)
+        asyncio.run(asyncio.wait_for(send(), 10))
+        # switch: d1 sent, d2 raised / mode: d1 rejected, d2 raised
+        assert conn.stats['sent'] == 1
+        assert conn.stats['failed'] == 3
+    finally:
+        conn.tyapi.post = post
+        release(conn)
+        del conn
+        gc.collect()
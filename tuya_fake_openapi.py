@@ -0,0 +1,68 @@
+"""
+Minimal fake Tuya OpenAPI server for testing the Tuya connector without the cloud.
+
+Usage:
+    python tuya_fake_openapi.py --port 8890 --delay 0.3
+Then set `api_endpoint: http://127.0.0.1:8890` under `machine.tuya` in the config.
+"""
+import argparse, json, time, threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+STATS = {'token': 0, 'commands': 0, 'in_flight': 0, 'max_in_flight': 0}
+STATS_LOCK = threading.Lock()
+
+
+class FakeOpenAPIHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive, like the real endpoint
+    delay = 0.0
+    expire = 7200  # Token lifetime in seconds, the client refreshes 120s before expiry
+
+    def log_message(self, format, *args):
+        pass
+
+    def reply(self, result):
+        body = json.dumps({'success': True, 't': int(time.time() * 1000), 'result': result}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.startswith('/v1.0/token'):
+            with STATS_LOCK:
+                STATS['token'] += 1
+            self.reply({'access_token': 'fake-access', 'refresh_token': 'fake-refresh', 'expire_time': self.expire, 'uid': 'fake'})
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        with STATS_LOCK:
+            STATS['in_flight'] += 1
+            STATS['max_in_flight'] = max(STATS['max_in_flight'], STATS['in_flight'])
+        time.sleep(self.delay)  # Simulated cloud round trip
+        with STATS_LOCK:
+            STATS['in_flight'] -= 1
+            STATS['commands'] += 1
+        print(f"{time.strftime('%H:%M:%S')} {self.path} {body.get('commands')} {STATS}")
+        self.reply(True)
+
+
+def serve(host='127.0.0.1', port=8890, delay=0.0, expire=7200):
+    FakeOpenAPIHandler.delay = delay
+    FakeOpenAPIHandler.expire = expire
+    server = ThreadingHTTPServer((host, port), FakeOpenAPIHandler)
+    server.daemon_threads = True
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Fake Tuya OpenAPI server.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8890)
+    parser.add_argument('--delay', type=float, default=0.3, help='seconds per command request')
+    parser.add_argument('--expire', type=int, default=7200, help='token lifetime in seconds, <= 120 makes every command refresh it')
+    args = parser.parse_args()
+    print(f"Fake Tuya OpenAPI on http://{args.host}:{args.port} (delay {args.delay}s)")
+    serve(args.host, args.port, args.delay, args.expire).serve_forever()